@@ -0,0 +1,113 @@
+""" 性能测试使用的本地替身服务."""
+import threading
+import typing as t
+from types import SimpleNamespace
+
+from lesoon_common import LesoonFlask
+from lesoon_common import success_response
+from lesoon_restful import Api
+from lesoon_restful import Resource
+from lesoon_restful import Route
+from werkzeug.serving import make_server
+
+# 大报文的记录数
+LARGE_SIZE = 2000
+
+
+def make_rows(size: int) -> t.List[dict]:
+    return [{
+        'id': i,
+        'code': f'code-{i:06d}',
+        'name': f'名称-{i}',
+        'enabled': i % 2 == 0,
+        'amount': i * 1.5,
+        'tags': ['a', 'b', 'c'],
+    } for i in range(size)]
+
+
+class Config:
+    TESTING = True
+    SECRET_KEY = 'benchmark'
+    JWT_ENABLE = True
+    CLIENT = {'BASE_URL': '', 'PROVIDER_URLS': {}}
+
+
+class BenchResource(Resource):
+
+    class Meta:
+        name = 'bench'
+
+    small_rows = make_rows(1)
+
+    large_rows = make_rows(LARGE_SIZE)
+
+    @Route.GET('')
+    def get(self):
+        return success_response(result=self.small_rows)
+
+    @Route.GET('/large')
+    def large(self):
+        return success_response(result=self.large_rows)
+
+    @Route.GET('/page')
+    def page(self):
+        return success_response(result=self.small_rows)
+
+    @Route.POST('/batch')
+    def create_many(self):
+        return success_response()
+
+
+class BenchTracer:
+    """
+    link_tracer扩展的替身.
+    按B3规范注入请求头,使链路跟踪请求头的拷贝计入测试.
+
+    """
+
+    def __init__(self):
+        self.tracer = self
+        self.span = SimpleNamespace(
+            context=SimpleNamespace(
+                trace_id=0x062b6c669aa91995, span_id=0x3d18c271eaf03bfa))
+
+    def get_span(self):
+        return self.span
+
+    def inject(self, span_context, format, carrier: dict):
+        carrier['X-B3-TraceId'] = f'{span_context.trace_id:016x}'
+        carrier['X-B3-SpanId'] = f'{span_context.span_id:016x}'
+        carrier['X-B3-Sampled'] = '1'
+
+
+def create_app() -> LesoonFlask:
+    app = LesoonFlask(__name__, config=Config)
+    api = Api(app)
+    BenchResource.api = None
+    api.add_resource(BenchResource)
+    app.extensions['link_tracer'] = BenchTracer()
+    return app
+
+
+class LocalServer:
+    """ 在后台线程中启动的本地服务."""
+
+    def __init__(self,
+                 app: LesoonFlask,
+                 host: str = 'localhost',
+                 port: int = 0):
+        self.srv = make_server(host=host, port=port, app=app, threaded=True)
+        self.thread = threading.Thread(
+            target=self.srv.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.srv.host}:{self.srv.port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.srv.shutdown()
+        self.thread.join()
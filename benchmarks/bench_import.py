@@ -0,0 +1,91 @@
+"""
+lesoon_client导入耗时测试.
+
+用法:
+    python -m benchmarks.bench_import                  # 运行并与基线比对
+    python -m benchmarks.bench_import --save-baseline  # 运行并保存为基线
+
+每次导入均在新的解释器进程中进行,度量短生命周期任务每次启动需付出的开销.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import typing as t
+
+from benchmarks import harness
+from benchmarks.run import DEFAULT_BASELINE
+
+# 导入用例 {用例名: 导入语句}
+IMPORT_CASES = {
+    'import_package': 'import lesoon_client',
+    'import_base_client': 'from lesoon_client import BaseClient',
+    'import_lesoon_client': 'from lesoon_client import LesoonClient',
+}
+
+# 关注的重量级依赖
+HEAVY_MODULES = ('flask', 'lesoon_common', 'opentracing', 'jwt', 'werkzeug')
+
+_SNIPPET = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed * 1000, len(sys.modules), ','.join(heavy))
+'''
+
+
+def measure_import(statement: str, repeat: int) -> t.Tuple[dict, str]:
+    samples, modules, heavy = [], 0, ''
+    for _ in range(repeat):
+        output = subprocess.run(
+            [
+                sys.executable, '-c',
+                _SNIPPET.format(statement=statement, heavy=HEAVY_MODULES)
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        samples.append(float(output[0]))
+        modules = int(output[1])
+        heavy = output[2] if len(output) > 2 else ''
+    return {
+        'import_ms': statistics.median(samples),
+        'modules': modules,
+    }, heavy
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='lesoon_client导入耗时测试')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=10, help='每个用例的导入次数')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    parser.add_argument(
+        '--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的劣化比例')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, statement in IMPORT_CASES.items():
+        results[name], heavy = measure_import(statement, args.repeat)
+        print(f'{name:<24}import_ms={results[name]["import_ms"]:.1f}  '
+              f'modules={results[name]["modules"]}  已加载: {heavy or "-"}')
+
+    baseline = harness.load_baseline(args.baseline)
+    if args.save_baseline:
+        baseline.setdefault('import', {}).update(results)
+        harness.save_baseline(args.baseline, baseline)
+        print(f'基线已保存至 {args.baseline}')
+        return 0
+
+    regressions = harness.compare(results, baseline.get('import', {}),
+                                  args.tolerance)
+    for regression in regressions:
+        print(f'性能劣化: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+""" 性能测试度量与基线比对."""
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+import typing as t
+from contextlib import nullcontext
+
+ContextFactory = t.Callable[[], t.ContextManager]
+
+
+def _percentile(samples: t.List[float], percent: float) -> float:
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(percent / 100 * len(samples))))
+    return samples[index]
+
+
+def measure_latency(func: t.Callable,
+                    iterations: int,
+                    warmup: int = 10,
+                    context: ContextFactory = nullcontext) -> dict:
+    """ 单线程下单次调用耗时(微秒)."""
+    samples = []
+    with context():
+        for _ in range(warmup):
+            func()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1e6)
+    return {
+        'p50_us': _percentile(samples, 50),
+        'p99_us': _percentile(samples, 99),
+        'mean_us': statistics.fmean(samples),
+    }
+
+
+def measure_throughput(func: t.Callable,
+                       iterations: int,
+                       threads: int,
+                       context: ContextFactory = nullcontext) -> float:
+    """ 多线程下每秒调用次数,每个线程执行iterations次."""
+    barrier = threading.Barrier(threads + 1)
+    errors: t.List[BaseException] = []
+
+    def worker():
+        with context():
+            barrier.wait()
+            try:
+                for _ in range(iterations):
+                    func()
+            except BaseException as e:
+                errors.append(e)
+            barrier.wait()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    barrier.wait()
+    elapsed = time.perf_counter() - start
+    for w in workers:
+        w.join()
+    if errors:
+        raise errors[0]
+    return threads * iterations / elapsed
+
+
+def measure_allocations(func: t.Callable,
+                        iterations: int,
+                        context: ContextFactory = nullcontext) -> dict:
+    """ 单次调用的内存分配峰值以及残留内存(字节)."""
+    peaks = []
+    with context():
+        func()
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            for _ in range(iterations):
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                func()
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+            end, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        'peak_alloc_bytes': statistics.median(peaks),
+        'retained_bytes': max(0, end - start) / iterations,
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.startswith('calls_per_sec')
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> t.List[str]:
+    """
+    与基线比对.
+
+    Args:
+        results: 本次结果 {用例: {指标: 值}}
+        baseline: 基线结果
+        tolerance: 允许的劣化比例,如0.2表示允许劣化20%
+
+    Returns:
+        劣化超出容忍范围的指标描述
+
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(case, {}).get(metric)
+            if not base:
+                continue
+            if higher_is_better(metric):
+                regressed = value < base * (1 - tolerance)
+            else:
+                regressed = value > base * (1 + tolerance)
+            if regressed:
+                regressions.append(
+                    f'{case}.{metric}: {value:.1f} (基线 {base:.1f})')
+    return regressions
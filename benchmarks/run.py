@@ -0,0 +1,201 @@
+"""
+client请求链路性能测试.
+
+用法:
+    python -m benchmarks.run                      # 运行并与基线比对
+    python -m benchmarks.run --save-baseline      # 运行并保存为基线
+    python -m benchmarks.run --server -k lesoon   # 通过本地http服务运行部分用例
+    python -m benchmarks.run --server --transport urllib3  # 指定http后端
+
+默认使用 :class:`WSGITransport` 在内存中调用替身服务,仅度量client自身开销;
+--server 则启动本地werkzeug服务,度量包含网络栈在内的开销,
+可通过 --transport 比较不同http后端的单次调用开销.
+劣化超过容忍范围时返回码为1.
+"""
+import argparse
+import json
+import os
+import sys
+import typing as t
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+from benchmarks import harness
+from benchmarks.app import create_app
+from benchmarks.app import LARGE_SIZE
+from benchmarks.app import LocalServer
+from benchmarks.app import make_rows
+from lesoon_common.dataclass.req import PageParam
+
+from lesoon_client import BaseClient
+from lesoon_client import Java3Client
+from lesoon_client import JavaClient
+from lesoon_client import LesoonClient
+from lesoon_client import PythonClient
+from lesoon_client.core.transport import BaseTransport
+from lesoon_client.core.transport import get_transport
+from lesoon_client.core.transport import TRANSPORTS
+from lesoon_client.core.transport import WSGITransport
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# 入站请求头,用于触发token以及链路跟踪请求头的继承
+INBOUND_HEADERS = {
+    'token': 'benchmark-token',
+    'user-speciality': 'userId=1',
+    'x-request-id': '6f1c0d3a-2b1e-4e8f-9c55-1b2d3e4f5a6b',
+    'x-ot-span-context': '062b6c669aa91995;3d18c271eaf03bfa;0000000000000000',
+}
+
+
+class BenchBaseClient(BaseClient):
+    URL_PREFIX = '/bench'
+
+
+class BenchLesoonClient(LesoonClient):
+    PROVIDER = 'bench'
+    URL_PREFIX = '/bench'
+
+
+class BenchPythonClient(PythonClient):
+    PROVIDER = 'bench'
+    URL_PREFIX = '/bench'
+
+
+class BenchJava3Client(Java3Client):
+    PROVIDER = 'bench'
+    URL_PREFIX = '/bench'
+
+
+class BenchJava2Client(JavaClient):
+    PROVIDER = 'bench'
+    URL_PREFIX = '/bench'
+
+
+def _json_response(payload: t.Any):
+    content = json.dumps(payload).encode('utf-8')
+    return BaseTransport.build_response(None, 200, 'OK',
+                                        {'Content-Type': 'application/json'},
+                                        content)
+
+
+def build_cases(base_url: str,
+                transport: BaseTransport) -> t.Dict[str, t.Callable]:
+    """ 构建性能测试用例 {用例名: 无参调用}."""
+    base_client = BenchBaseClient(base_url=base_url, transport=transport)
+    lesoon_client = BenchLesoonClient(base_url=base_url, transport=transport)
+    python_client = BenchPythonClient(base_url=base_url, transport=transport)
+    java3_client = BenchJava3Client(base_url=base_url, transport=transport)
+    java2_client = BenchJava2Client(base_url=base_url, transport=transport)
+
+    small_response = _json_response(make_rows(1))
+    large_response = _json_response(make_rows(LARGE_SIZE))
+    page_param = PageParam(page=1, page_size=20, where={'code': 'code-000001'})
+    rows = make_rows(100)
+
+    return {
+        'base_request': lambda: base_client.GET(''),
+        'lesoon_request': lambda: lesoon_client.GET(''),
+        'decode_small': lambda: base_client._decode_result(small_response),
+        'decode_large': lambda: base_client._decode_result(large_response),
+        'page_get_python': lambda: python_client.page_get(page_param),
+        'page_get_java3': lambda: java3_client.page_get(page_param),
+        'page_get_java2': lambda: java2_client.page_get(page_param),
+        'create_many': lambda: lesoon_client.create_many(rows),
+    }
+
+
+def run_case(func: t.Callable, context: harness.ContextFactory, iterations: int,
+             threads: t.List[int]) -> dict:
+    metrics = harness.measure_latency(func, iterations, context=context)
+    for n in threads:
+        metrics[f'calls_per_sec@{n}'] = harness.measure_throughput(
+            func, max(1, iterations // n), n, context=context)
+    metrics.update(
+        harness.measure_allocations(
+            func, max(1, iterations // 10), context=context))
+    return metrics
+
+
+def print_results(results: dict):
+    for case, metrics in results.items():
+        print(f'{case:<20}' + '  '.join(
+            f'{metric}={value:,.1f}' for metric, value in metrics.items()))
+
+
+def parse_args(argv: t.Optional[t.List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='client请求链路性能测试')
+    parser.add_argument(
+        '-n', '--iterations', type=int, default=500, help='每个用例的调用次数')
+    parser.add_argument(
+        '-t', '--threads', default='1,4,8', help='吞吐量测试的线程数,逗号分隔')
+    parser.add_argument('-k', '--filter', default='', help='仅运行名称包含该字符串的用例')
+    parser.add_argument(
+        '--server', action='store_true', help='启动本地http服务并通过网络调用')
+    parser.add_argument(
+        '--transport',
+        default='requests',
+        choices=list(TRANSPORTS),
+        help='--server模式下使用的http后端')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    parser.add_argument(
+        '--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的劣化比例')
+    return parser.parse_args(argv)
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    args = parse_args(argv)
+    threads = [int(n) for n in args.threads.split(',') if n]
+    app = create_app()
+
+    @contextmanager
+    def context():
+        with app.test_request_context(headers=INBOUND_HEADERS):
+            yield
+
+    if args.server:
+        server_ctx: t.ContextManager = LocalServer(app)
+    else:
+        server_ctx = nullcontext()
+
+    with server_ctx as server:
+        if server is not None:
+            base_url = server.url
+            transport = get_transport(args.transport)
+        else:
+            base_url = 'http://localhost'
+            transport = WSGITransport(app)
+        app.config['CLIENT']['BASE_URL'] = base_url
+
+        results = {}
+        for name, func in build_cases(base_url, transport).items():
+            if args.filter in name:
+                results[name] = run_case(func, context, args.iterations,
+                                         threads)
+
+    print_results(results)
+
+    # 内存调用与网络调用的结果差异较大,基线按运行模式分开保存
+    mode = f'server-{args.transport}' if args.server else 'wsgi'
+    baseline = harness.load_baseline(args.baseline)
+    if args.save_baseline:
+        baseline.setdefault(mode, {}).update(results)
+        harness.save_baseline(args.baseline, baseline)
+        print(f'基线已保存至 {args.baseline}')
+        return 0
+
+    if mode not in baseline:
+        print(
+            f'{args.baseline} 中没有 {mode} 模式的基线,请先使用--save-baseline保存',
+            file=sys.stderr)
+        return 1
+
+    regressions = harness.compare(results, baseline[mode], args.tolerance)
+    for regression in regressions:
+        print(f'性能劣化: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
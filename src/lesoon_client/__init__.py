@@ -1,7 +1,36 @@
-from lesoon_client.core.base import BaseClient
-from lesoon_client.wrappers.client import Java2Client as JavaClient
-from lesoon_client.wrappers.client import Java3Client
-from lesoon_client.wrappers.client import LesoonClient
-from lesoon_client.wrappers.client import PythonClient
+import importlib
+import typing as t
 
 __version__ = '0.0.4'
+
+# 延迟导入的属性 {属性名: (模块, 模块内名称)}
+# 仅使用BaseClient时不会加载flask/lesoon_common/opentracing等依赖
+_LAZY_ATTRS = {
+    'BaseClient': ('lesoon_client.core.base', 'BaseClient'),
+    'JavaClient': ('lesoon_client.wrappers.client', 'Java2Client'),
+    'Java3Client': ('lesoon_client.wrappers.client', 'Java3Client'),
+    'LesoonClient': ('lesoon_client.wrappers.client', 'LesoonClient'),
+    'PythonClient': ('lesoon_client.wrappers.client', 'PythonClient'),
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+if t.TYPE_CHECKING:
+    from lesoon_client.core.base import BaseClient
+    from lesoon_client.wrappers.client import Java2Client as JavaClient
+    from lesoon_client.wrappers.client import Java3Client
+    from lesoon_client.wrappers.client import LesoonClient
+    from lesoon_client.wrappers.client import PythonClient
+
+
+def __getattr__(name: str) -> t.Any:
+    if name in _LAZY_ATTRS:
+        module_name, attr = _LAZY_ATTRS[name]
+        value = getattr(importlib.import_module(module_name), attr)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> t.List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
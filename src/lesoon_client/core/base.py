@@ -3,13 +3,21 @@ import inspect
 import json
 import logging
 import re
+import time
 import typing as t
 from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from lesoon_common.utils.base import AttributeDict
 
 from lesoon_client.core.exceptions import ClientException
+from lesoon_client.core.exceptions import ConcurrencyLimitExceeded
+from lesoon_client.core.limiter import AdaptiveLimiter
+from lesoon_client.core.process import ProcessLocal
+from lesoon_client.core.profiling import CallProfiler
+from lesoon_client.core.transport import BaseTransport
+from lesoon_client.core.transport import close_adapters
+from lesoon_client.core.transport import get_transport
+from lesoon_client.core.transport import SessionTransport
 
 
 class BaseClient:
@@ -19,14 +27,27 @@ class BaseClient:
     Attributes:
         base_url: 域名,默认为cls.BASE_URL
         url_prefix: url前缀
+        transport: 传输层或后端名称(requests/urllib3/httpx),默认为cls.TRANSPORT,
+                   未设置时使用cls.http发送请求
+        profiler: 调用耗时分析器,默认为cls.PROFILER,为空时不做耗时分析
+        limiter: 自适应并发限制器,默认为cls.LIMITER,为空时不做并发限制
     """
     BASE_URL: str = ''
 
     URL_PREFIX: str = ''
 
-    http = requests.Session()
+    TRANSPORT: t.Union[str, BaseTransport, None] = None
 
-    executor = ThreadPoolExecutor(thread_name_prefix='app_client')
+    PROFILER: t.Optional[CallProfiler] = None
+
+    LIMITER: t.Optional[AdaptiveLimiter] = None
+
+    # 会话与线程池按进程懒创建;fork后子进程沿用父进程已配置的会话(仅清空连接池),
+    # 线程池在子进程中重新创建
+    http = ProcessLocal(requests.Session, reset=close_adapters)
+
+    executor = ProcessLocal(
+        lambda: ThreadPoolExecutor(thread_name_prefix='app_client'))
 
     @property
     def log(self):
@@ -39,9 +60,20 @@ class BaseClient:
 
     def __init__(self,
                  base_url: t.Optional[str] = None,
-                 url_prefix: t.Optional[str] = None):
+                 url_prefix: t.Optional[str] = None,
+                 transport: t.Union[str, BaseTransport, None] = None,
+                 profiler: t.Optional[CallProfiler] = None,
+                 limiter: t.Optional[AdaptiveLimiter] = None):
         self.base_url = base_url or self.BASE_URL
         self.url_prefix = url_prefix or self.URL_PREFIX
+        transport = transport or self.TRANSPORT
+        if isinstance(transport, str):
+            transport = get_transport(transport)
+        # 传入http描述符本身而非当前进程的会话,使传输层在fork后同样可用
+        self.transport = transport or SessionTransport(
+            inspect.getattr_static(self, 'http'))
+        self.profiler = profiler or self.PROFILER
+        self.limiter = limiter or self.LIMITER
         self._log = None
         self.logger_handler = logging.StreamHandler()
 
@@ -60,10 +92,30 @@ class BaseClient:
     def _build_uri_prefix(self, kwargs: dict):
         return self.base_url + self.url_prefix
 
+    def _mark(self, stage: str):
+        """ 记录调用阶段耗时,未开启耗时分析时仅有一次属性判断的开销."""
+        if self.profiler is not None:
+            self.profiler.mark(stage)
+
     def request(self, method: str, rule: str, **kwargs):
+        if self.profiler is None:
+            return self._send(method, rule, **kwargs)
+
+        self.profiler.begin(method, rule)
+        try:
+            result = self._send(method, rule, **kwargs)
+        except Exception as e:
+            self.profiler.end(error=e)
+            raise
+        self.profiler.end()
+        return result
+
+    def _send(self, method: str, rule: str, **kwargs):
         self._handle_pre_request(method, kwargs)
         uri_prefix = self._build_uri_prefix(kwargs)
         request_url = re.sub(r'(?<!:)//', '/', uri_prefix + rule)
+        if self.profiler is not None:
+            self.profiler.mark('pre_request', url=request_url)
         try:
             return self._request(method, request_url, **kwargs)
         except ClientException as e:
@@ -87,19 +139,15 @@ class BaseClient:
                     object_hook: 返回类型，用于做返回结果类型转换
                     object_key_hook: 返回类型，用于做返回结果类型转换
                     其余请求参数参考 :func:`requests.sessions.request`
+                    传输层会忽略其无法识别的参数
 
         """
-        # http.request函数签名所定义的参数
-        allow_request_param_key = set(
-            inspect.signature(self.http.request).parameters.keys())
-        # kwarg中符合http.request函数中的参数
-        input_request_param_key = set(
-            kwargs.keys()).intersection(allow_request_param_key)
-
-        res: requests.Response = self.http.request(
-            method=method,
-            url=request_url,
-            **{k: v for k, v in kwargs.items() if k in input_request_param_key})
+        res = self._transport_request(method, request_url, **kwargs)
+        if self.profiler is not None:
+            self.profiler.mark(
+                'network',
+                request_size=_body_size(res.request),
+                response_size=len(res.content))
         try:
             res.raise_for_status()
         except requests.RequestException as e:
@@ -111,12 +159,39 @@ class BaseClient:
                 client=self, request=e.request, response=e.response)
 
         result = self._handle_result(res, method, request_url, **kwargs)
+        self._mark('handle_result')
 
         self.log.info(f'\n【请求地址】: {method.upper()} {request_url}'
                       f'\n【请求参数】：{str(kwargs)[:100]}...'
                       f'\n【响应数据】：{str(result)[:100]}...')
         return result
 
+    def _transport_request(self, method: str, request_url: str,
+                           **kwargs) -> requests.Response:
+        """
+        通过传输层发送请求.
+        开启并发限制时,以往返耗时以及异常(网络异常/服务端5xx)调整并发限制,
+        超出限制时抛出 :class:`ConcurrencyLimitExceeded`.
+        缓存命中等无需网络调用的响应不受并发限制,也不计入往返耗时.
+        """
+        limiter = self.limiter
+        if limiter is None:
+            return self.transport.request(method, request_url, **kwargs)
+
+        res, send = self.transport.lookup(method, request_url, **kwargs)
+        if res is not None:
+            return res
+        if not limiter.acquire():
+            raise ConcurrencyLimitExceeded(client=self, limit=limiter.limit)
+        dropped = True
+        start = time.perf_counter()
+        try:
+            res = send()
+            dropped = res.status_code >= 500
+            return res
+        finally:
+            limiter.release(time.perf_counter() - start, dropped)
+
     def _decode_result(self, res: requests.Response):
         """
         解析请求结果.
@@ -131,7 +206,7 @@ class BaseClient:
         """
 
         try:
-            res = res.json(object_hook=AttributeDict, strict=False)
+            res = res.json(object_hook=_attribute_dict(), strict=False)
         except (TypeError, ValueError) as e:
             self.log.error(f'无法将调用结果转化为json:{e}', exc_info=True)
             return res.text
@@ -158,6 +233,7 @@ class BaseClient:
         """
         if not isinstance(res, dict):
             result = self._decode_result(res)
+            self._mark('decode')
         else:
             result = res
 
@@ -176,3 +252,26 @@ class BaseClient:
 
     def DELETE(self, rule: str, **kwargs):
         return self.request('DELETE', rule, **kwargs)
+
+
+_AttributeDict: t.Optional[t.Type[dict]] = None
+
+
+def _attribute_dict() -> t.Type[dict]:
+    """ 延迟导入AttributeDict,避免仅使用BaseClient时加载lesoon_common."""
+    global _AttributeDict
+    if _AttributeDict is None:
+        from lesoon_common.utils.base import AttributeDict
+        _AttributeDict = AttributeDict
+    return _AttributeDict
+
+
+def _body_size(
+        request: t.Optional[requests.PreparedRequest]) -> t.Optional[int]:
+    if request is None or request.body is None:
+        return None
+    if isinstance(request.body, (bytes, str)):
+        return len(request.body)
+    # 文件/生成器等请求体无法直接获取长度
+    length = request.headers.get('Content-Length')
+    return int(length) if length else None
@@ -0,0 +1,265 @@
+""" 调用结果磁盘缓存模块."""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from lesoon_client.core.transport import BaseTransport
+from lesoon_client.core.transport import SendFn
+
+# 默认参与缓存键的请求头,参考数据在用户间共享
+KEY_HEADERS: t.Tuple[str, ...] = ()
+
+# 区分用户的请求头,按用户缓存时加入key_headers.
+# 开启JWT且无入站token时client会为每次调用签发新token,此时按用户缓存无法命中
+USER_KEY_HEADERS = ('authorization', 'cookie', 'token', 'user-speciality')
+
+
+class CacheEntry(t.NamedTuple):
+    status_code: int
+    reason: str
+    headers: dict
+    content: bytes
+    etag: t.Optional[str]
+    stored_at: float
+    # 响应Vary所列请求头在存储时的取值
+    vary: t.Optional[dict] = None
+
+
+class DiskCache:
+    """
+    基于SQLite的磁盘缓存.
+    同一主机上的多个进程可共享同一缓存文件,读取时使用内存映射.
+
+    Attributes:
+        path: 缓存文件路径
+        ttl: 有效期(秒),过期后若有ETag则向服务端重新校验
+        max_size: 缓存内容的最大容量(字节),超出时淘汰最久未访问的记录
+    """
+    # 命中时距上次记录访问时间超过 ttl*ACCESS_UPDATE_RATIO 才更新访问时间,
+    # 避免每次命中都产生写事务(WAL模式下多进程的写入是串行的)
+    ACCESS_UPDATE_RATIO = 0.25
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = 300,
+                 max_size: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # sqlite连接不能跨线程与进程共享,按线程以及进程号创建
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={self.max_size}')
+            conn.execute('CREATE TABLE IF NOT EXISTS client_cache ('
+                         'key TEXT PRIMARY KEY, status_code INTEGER, '
+                         'reason TEXT, headers TEXT, content BLOB, etag TEXT, '
+                         'stored_at REAL, vary TEXT, accessed_at REAL, '
+                         'size INTEGER)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> t.Optional[CacheEntry]:
+        conn = self.conn
+        row = conn.execute(
+            'SELECT status_code, reason, headers, content, etag, stored_at, '
+            'vary, accessed_at FROM client_cache WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        (status_code, reason, headers, content, etag, stored_at, vary,
+         accessed_at) = row
+        now = time.time()
+        if now - accessed_at >= self.ttl * self.ACCESS_UPDATE_RATIO:
+            conn.execute(
+                'UPDATE client_cache SET accessed_at = ? WHERE key = ?',
+                (now, key))
+        return CacheEntry(status_code, reason, json.loads(headers), content,
+                          etag, stored_at,
+                          json.loads(vary) if vary else None)
+
+    def set(self, key: str, entry: CacheEntry):
+        size = len(entry.content)
+        if size > self.max_size:
+            return
+        self.conn.execute(
+            'INSERT OR REPLACE INTO client_cache VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, entry.status_code, entry.reason, json.dumps(
+                entry.headers), entry.content, entry.etag, entry.stored_at,
+             json.dumps(entry.vary) if entry.vary is not None else None,
+             time.time(), size))
+        self._evict()
+
+    def touch(self, key: str, stored_at: float):
+        """ 重新校验通过后刷新记录的存储时间."""
+        self.conn.execute(
+            'UPDATE client_cache SET stored_at = ?, accessed_at = ? '
+            'WHERE key = ?', (stored_at, time.time(), key))
+
+    def delete(self, key: str):
+        self.conn.execute('DELETE FROM client_cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self.conn.execute('DELETE FROM client_cache')
+
+    def _evict(self):
+        total = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM client_cache').fetchone()[0]
+        if total <= self.max_size:
+            return
+        evict_keys = []
+        for key, size in self.conn.execute(
+                'SELECT key, size FROM client_cache ORDER BY accessed_at'):
+            if total <= self.max_size:
+                break
+            evict_keys.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM client_cache WHERE key = ?',
+                              evict_keys)
+
+
+class CachingTransport(BaseTransport):
+    """
+    缓存传输层.
+    缓存GET请求成功的响应,适用于数据量大且变化缓慢的参考数据接口.
+    单次调用可通过 cache=False 跳过缓存.
+    缓存键包含key_headers所列请求头的取值,默认不区分用户;
+    响应因用户而异时需加入USER_KEY_HEADERS,
+    通过CLIENT.PROPAGATE_HEADERS继承的租户等请求头需加入key_headers.
+    响应的Cache-Control含no-store/private时不缓存;
+    响应含Vary时仅在所列请求头取值一致时命中,Vary为*时不缓存.
+
+    Attributes:
+        transport: 实际发送请求的传输层
+        cache: 磁盘缓存
+        key_headers: 参与缓存键的请求头
+    """
+
+    def __init__(self,
+                 transport: BaseTransport,
+                 cache: DiskCache,
+                 key_headers: t.Iterable[str] = KEY_HEADERS):
+        self.transport = transport
+        self.cache = cache
+        self.key_headers = tuple(sorted({key.lower() for key in key_headers}))
+
+    def cache_key(self, method: str, url: str, **kwargs) -> str:
+        """ 以 请求方式+请求地址+查询参数+key_headers 的摘要作为缓存键."""
+        params = kwargs.get('params') or {}
+        if not isinstance(params, (str, bytes)):
+            params = sorted((str(k), str(v)) for k, v in (
+                params.items() if hasattr(params, 'items') else params))
+        headers = CaseInsensitiveDict(kwargs.get('headers') or {})
+        key_headers = [(key, headers.get(key)) for key in self.key_headers]
+        # 键中包含token等敏感信息,仅保存摘要
+        return hashlib.sha256(
+            json.dumps([method.upper(), url, params, key_headers],
+                       ensure_ascii=False,
+                       default=str).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def storable(res: requests.Response) -> bool:
+        """ 响应是否可缓存."""
+        directives = {
+            directive.split('=', 1)[0].strip().lower()
+            for directive in res.headers.get('Cache-Control', '').split(',')
+        }
+        if directives & {'no-store', 'private'}:
+            return False
+        return '*' not in _vary_headers(res.headers)
+
+    def _build_response(self, entry: CacheEntry, url: str):
+        return self.build_response(
+            None,
+            entry.status_code,
+            entry.reason,
+            entry.headers,
+            entry.content,
+            url=url)
+
+    @staticmethod
+    def _cacheable(method: str, kwargs: dict) -> bool:
+        return method.upper() == 'GET' and kwargs.get('cache', True)
+
+    def _get_entry(self, key: str,
+                   headers: t.Mapping[str, str]) -> t.Optional[CacheEntry]:
+        entry = self.cache.get(key)
+        if entry is not None and entry.vary and any(
+                headers.get(name) != value
+                for name, value in entry.vary.items()):
+            # 缓存的是其他变体
+            return None
+        return entry
+
+    def lookup(self, method: str, url: str,
+               **kwargs) -> t.Tuple[t.Optional[requests.Response], SendFn]:
+        if not self._cacheable(method, kwargs):
+            return None, functools.partial(self.transport.request, method, url,
+                                           **kwargs)
+
+        key = self.cache_key(method, url, **kwargs)
+        headers = CaseInsensitiveDict(kwargs.get('headers') or {})
+        entry = self._get_entry(key, headers)
+        send = functools.partial(self._send, method, url, key, headers, entry,
+                                 kwargs)
+        if entry is not None and time.time() - entry.stored_at < self.cache.ttl:
+            return self._build_response(entry, url), send
+        return None, send
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        res, send = self.lookup(method, url, **kwargs)
+        return res if res is not None else send()
+
+    def _send(self, method: str, url: str, key: str, headers: t.Mapping[str,
+                                                                        str],
+              entry: t.Optional[CacheEntry], kwargs: dict) -> requests.Response:
+        """ 发送缓存未命中或已过期的请求,过期且有ETag时向服务端重新校验."""
+        if entry is not None and entry.etag:
+            revalidate_headers = dict(kwargs.get('headers') or {})
+            revalidate_headers['If-None-Match'] = entry.etag
+            kwargs = {**kwargs, 'headers': revalidate_headers}
+
+        res = self.transport.request(method, url, **kwargs)
+        now = time.time()
+        if res.status_code == 304 and entry is not None:
+            self.cache.touch(key, now)
+            return self._build_response(entry, url)
+        if res.status_code == 200:
+            if self.storable(res):
+                vary = {
+                    name: headers.get(name)
+                    for name in _vary_headers(res.headers)
+                }
+                self.cache.set(
+                    key,
+                    CacheEntry(res.status_code, res.reason,
+                               dict(res.headers), res.content,
+                               res.headers.get('ETag'), now, vary or None))
+            elif entry is not None:
+                self.cache.delete(key)
+        return res
+
+
+def _vary_headers(headers: t.Mapping[str, str]) -> t.List[str]:
+    return [
+        name.strip().lower()
+        for name in headers.get('Vary', '').split(',')
+        if name.strip()
+    ]
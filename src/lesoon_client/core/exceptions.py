@@ -1,12 +1,10 @@
 import typing as t
 
 import requests
-from lesoon_common import ServiceError
-from lesoon_common.code import ResponseCode
 
 if t.TYPE_CHECKING:
     from lesoon_client.core.base import BaseClient
-    from lesoon_client.wrappers.client import LesoonClient
+    from lesoon_client.wrappers.exceptions import RemoteCallError
 
 
 class ClientException(Exception):
@@ -20,14 +18,20 @@ class ClientException(Exception):
         self.response = response
 
 
-class RemoteCallError(ClientException, ServiceError):
-    CODE = ResponseCode.RemoteCallError
+class ConcurrencyLimitExceeded(ClientException):
+    """ 并发调用数超出自适应并发限制."""
 
-    def __init__(self,
-                 client: 'LesoonClient',
-                 errmsg: t.Optional[str] = None,
-                 request: t.Optional[requests.Request] = None,
-                 response: t.Optional[requests.Response] = None):
-        ClientException.__init__(
-            self, client=client, request=request, response=response)
-        ServiceError.__init__(self, msg_detail=errmsg)
+    def __init__(self, client: 'BaseClient', limit: int):
+        super().__init__(client=client)
+        self.limit = limit
+
+    def __str__(self):
+        return f'并发调用数超出限制:{self.limit}'
+
+
+def __getattr__(name: str) -> t.Any:
+    # RemoteCallError依赖lesoon_common,首次访问时才导入,避免仅使用BaseClient时加载
+    if name == 'RemoteCallError':
+        from lesoon_client.wrappers.exceptions import RemoteCallError
+        return RemoteCallError
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
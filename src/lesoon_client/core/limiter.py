@@ -0,0 +1,114 @@
+""" 自适应并发限制模块."""
+import threading
+import typing as t
+
+from lesoon_client.core.process import register_after_fork
+
+
+class AdaptiveLimiter:
+    """
+    自适应并发限制器(AIMD).
+    根据调用的往返耗时与异常自动调整允许的并发调用数:
+        调用异常(网络异常/服务端5xx)时,限制乘以backoff_ratio;
+        短期耗时超过 长期耗时*tolerance 时,限制乘以backoff_ratio;
+        否则并发数达到限制的一半以上时,限制加1.
+    短期/长期耗时分别为调用耗时的快速/慢速指数加权平均,耗时较长的调用同样计入,
+    耗时持续处于新的水平时长期耗时随之变化,限制在短暂回退后重新增长.
+    耗时按限制器整体统计,同一provider下接口耗时差异较大时,建议为耗时较长的接口单独设置限制器.
+    超出限制的调用最多排队等待max_wait秒,超时后被拒绝.
+
+    Attributes:
+        limit: 当前并发限制
+        min_limit: 最小并发限制
+        max_limit: 最大并发限制
+        backoff_ratio: 限制减少时的乘数
+        tolerance: 耗时容忍倍数
+        max_wait: 超出限制时的最长等待时间(秒),为0时直接拒绝
+        smoothing: 长期耗时的平滑系数
+        short_smoothing: 短期耗时的平滑系数
+    """
+
+    def __init__(self,
+                 initial_limit: int = 20,
+                 min_limit: int = 1,
+                 max_limit: int = 200,
+                 backoff_ratio: float = 0.9,
+                 tolerance: float = 2.0,
+                 max_wait: float = 0,
+                 smoothing: float = 0.05,
+                 short_smoothing: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.tolerance = tolerance
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self.short_smoothing = short_smoothing
+        self._limit = float(initial_limit)
+        self._rtt: t.Optional[float] = None
+        self._short_rtt: t.Optional[float] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+        register_after_fork(self)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> bool:
+        """ 申请一个并发名额,被拒绝时返回False."""
+        with self._cond:
+            if self.in_flight >= self.limit:
+                if not self.max_wait or not self._cond.wait_for(
+                        lambda: self.in_flight < self.limit, self.max_wait):
+                    self.rejected += 1
+                    return False
+            self.in_flight += 1
+            return True
+
+    def release(self, rtt: float, dropped: bool = False):
+        """
+        归还并发名额并调整限制.
+
+        Args:
+            rtt: 本次调用往返耗时(秒)
+            dropped: 本次调用是否异常(网络异常/服务端5xx等)
+
+        """
+        with self._cond:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            if dropped:
+                self._backoff()
+            else:
+                # 耗时较长的调用同样计入长期耗时,使其能跟随耗时水平的变化
+                self._rtt = _ewma(self._rtt, rtt, self.smoothing)
+                self._short_rtt = _ewma(self._short_rtt, rtt,
+                                        self.short_smoothing)
+                if self._short_rtt > self._rtt * self.tolerance:
+                    self._backoff()
+                # 并发数远低于限制时说明调用量不足,不据此放大限制
+                elif in_flight * 2 >= self._limit:
+                    self._limit = min(self.max_limit, self._limit + 1)
+            self._cond.notify()
+
+    def _backoff(self):
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limit,
+            'inFlight': self.in_flight,
+            'rejected': self.rejected,
+            'rttMs': self._rtt * 1000 if self._rtt is not None else None,
+        }
+
+    def after_fork(self):
+        # 父进程中进行中的调用在子进程中不会归还名额
+        self._cond = threading.Condition()
+        self.in_flight = 0
+
+
+def _ewma(average: t.Optional[float], value: float, alpha: float) -> float:
+    return value if average is None else average + (value - average) * alpha
@@ -0,0 +1,317 @@
+""" 批量加载模块."""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+import typing as t
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from lesoon_client.core.process import ProcessLocal
+from lesoon_client.core.process import register_after_fork
+from lesoon_client.core.process import resolve
+
+# 批量调用函数: 接收键列表,返回与键顺序一致的结果列表或 {键: 结果} 字典
+BatchFn = t.Callable[[t.List[t.Any]], t.Any]
+
+# 上下文绑定函数: 在批次开始时(调用方线程中)包装批量调用,使其在调用方上下文中执行
+BindFn = t.Callable[[t.Callable], t.Callable]
+
+log = logging.getLogger(__name__)
+
+# 各线程模式加载器共享的批量调用线程池,与BaseClient.executor分开,
+# 避免批量调用占满业务异步调用的线程
+batch_executor: ProcessLocal[Executor] = ProcessLocal(
+    lambda: ThreadPoolExecutor(thread_name_prefix='batch_loader'))
+
+
+def scatter(keys: t.List[t.Any], results: t.Any) -> t.List[t.Any]:
+    """ 将批量调用结果按键的顺序分发,字典结果中缺失的键对应None."""
+    if isinstance(results, t.Mapping):
+        return [results.get(key) for key in keys]
+    results = list(results)
+    if len(results) != len(keys):
+        raise ValueError(f'批量调用返回{len(results)}条结果,与键数量{len(keys)}不一致')
+    return results
+
+
+class TimerHandle:
+    """ 定时回调句柄."""
+    __slots__ = ('deadline', 'callback')
+
+    def __init__(self, deadline: float, callback: t.Callable[[], t.Any]):
+        self.deadline = deadline
+        self.callback: t.Optional[t.Callable[[], t.Any]] = callback
+
+    def __lt__(self, other: 'TimerHandle') -> bool:
+        return self.deadline < other.deadline
+
+    def cancel(self):
+        # 释放回调的引用,已取消的句柄到期后直接丢弃
+        self.callback = None
+
+
+class Scheduler:
+    """
+    定时调度器.
+    由单个后台线程按到期时间执行回调,各加载器的收集窗口不再各自创建 threading.Timer.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queue: t.List[TimerHandle] = []
+        self._thread: t.Optional[threading.Thread] = None
+
+    def call_later(self, delay: float,
+                   callback: t.Callable[[], t.Any]) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + delay, callback)
+        with self._cond:
+            heapq.heappush(self._queue, handle)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='batch_loader_scheduler',
+                    daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def _run(self):
+        while True:
+            handle = self._next()
+            callback, handle.callback = handle.callback, None
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                log.warning(f'执行定时回调{callback!r}异常:{e}')
+
+    def _next(self) -> TimerHandle:
+        """ 等待并取出下一个到期的句柄."""
+        with self._cond:
+            while True:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                timeout = self._queue[0].deadline - time.monotonic()
+                if timeout <= 0:
+                    return heapq.heappop(self._queue)
+                self._cond.wait(timeout)
+
+
+# 调度线程在fork后的子进程中不存在,按进程创建
+_scheduler: ProcessLocal[Scheduler] = ProcessLocal(Scheduler)
+
+
+class BatchLoader:
+    """
+    自动批量加载器(线程模式).
+    收集时间窗口内的单个 load(key) 调用,合并为一次批量调用后将结果分发给各调用方,
+    相同的键在加载器的作用域内只加载一次.
+
+    Attributes:
+        batch_fn: 批量调用函数
+        max_batch_size: 单批次最大键数量,达到后立即发送
+        wait: 收集窗口(秒)
+        executor: 执行批量调用的线程池,未指定时使用共享的batch_executor
+        bind: 上下文绑定函数
+    """
+
+    def __init__(self,
+                 batch_fn: BatchFn,
+                 max_batch_size: int = 100,
+                 wait: float = 0.005,
+                 executor: t.Union[Executor, ProcessLocal[Executor],
+                                   None] = None,
+                 bind: t.Optional[BindFn] = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self._executor = executor or batch_executor
+        self.bind = bind
+        self._lock = threading.Lock()
+        self._pending: t.Dict[t.Any, Future] = {}
+        self._pending_fn: t.Optional[t.Callable] = None
+        self._handle: t.Optional[TimerHandle] = None
+        self._cache: t.Dict[t.Any, Future] = {}
+        register_after_fork(self)
+
+    @property
+    def executor(self) -> Executor:
+        return resolve(self._executor)
+
+    def after_fork(self):
+        # 父进程中未完成的批次在子进程中不会完成,丢弃收集中的键与记忆化结果
+        self._lock = threading.Lock()
+        self._pending, self._pending_fn = {}, None
+        self._handle = None
+        self._cache = {}
+
+    def load(self, key: t.Any) -> Future:
+        """ 加载单个键,返回结果的Future."""
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            future: Future = Future()
+            self._cache[key] = future
+            if not self._pending:
+                self._pending_fn = self.bind(
+                    self._run_batch) if self.bind else self._run_batch
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._handle is None:
+                self._handle = _scheduler.get().call_later(
+                    self.wait, self.dispatch)
+        return future
+
+    def load_many(self, keys: t.Iterable[t.Any]) -> t.List[Future]:
+        return [self.load(key) for key in keys]
+
+    def dispatch(self):
+        """ 立即发送已收集的键."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._pending:
+            return
+        # _pending_fn为绑定方法,发送后即释放,避免加载器与其形成引用环
+        batch, self._pending = self._pending, {}
+        batch_fn, self._pending_fn = self._pending_fn, None
+        self.executor.submit(batch_fn, batch)  # type: ignore
+
+    def _run_batch(self, batch: t.Dict[t.Any, Future]):
+        keys = list(batch)
+        try:
+            values = scatter(keys, self.batch_fn(keys))
+        except Exception as e:
+            # 失败的键不做记忆化,便于重试
+            with self._lock:
+                for key in keys:
+                    self._cache.pop(key, None)
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for future, value in zip(batch.values(), values):
+            future.set_result(value)
+
+    def clear(self, key: t.Any = None):
+        """ 清除记忆化结果,key为空时清除全部."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    @contextmanager
+    def scope(self):
+        """ 加载作用域,退出时发送剩余的键并清除记忆化结果."""
+        try:
+            yield self
+        finally:
+            self.dispatch()
+            self.clear()
+
+
+class AsyncBatchLoader:
+    """
+    自动批量加载器(asyncio模式).
+    同一事件循环中收集时间窗口内(默认为当前循环迭代)的 load(key) 调用并合并为一次批量调用.
+    批量调用函数可为协程函数,普通函数则在线程池中执行.
+
+    Attributes:
+        batch_fn: 批量调用函数
+        max_batch_size: 单批次最大键数量,达到后立即发送
+        wait: 收集窗口(秒)
+        executor: 执行普通批量调用函数的线程池,为空时使用事件循环默认线程池
+        bind: 上下文绑定函数,仅作用于普通批量调用函数
+    """
+
+    def __init__(self,
+                 batch_fn: BatchFn,
+                 max_batch_size: int = 100,
+                 wait: float = 0,
+                 executor: t.Union[Executor, ProcessLocal[Executor],
+                                   None] = None,
+                 bind: t.Optional[BindFn] = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.wait = wait
+        self.executor = executor
+        self.bind = bind
+        self._pending: t.Dict[t.Any, asyncio.Future] = {}
+        self._pending_fn: t.Optional[t.Callable] = None
+        self._handle: t.Optional[asyncio.Handle] = None
+        self._cache: t.Dict[t.Any, asyncio.Future] = {}
+        # 持有批量调用任务的引用,避免被垃圾回收
+        self._tasks: t.Set[asyncio.Task] = set()
+
+    async def load(self, key: t.Any) -> t.Any:
+        """ 加载单个键."""
+        if key not in self._cache:
+            loop = asyncio.get_running_loop()
+            self._cache[key] = loop.create_future()
+            if not self._pending:
+                self._pending_fn = self.bind(
+                    self.batch_fn) if self.bind else self.batch_fn
+            self._pending[key] = self._cache[key]
+            if len(self._pending) >= self.max_batch_size:
+                self.dispatch()
+            elif self._handle is None:
+                self._handle = loop.call_later(self.wait, self.dispatch)
+        # 多个调用方共享同一Future,单个调用方取消时不能影响其余调用方
+        return await asyncio.shield(self._cache[key])
+
+    async def load_many(self, keys: t.Iterable[t.Any]) -> t.List[t.Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def dispatch(self):
+        """ 立即发送已收集的键."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        task = asyncio.get_running_loop().create_task(
+            self._run_batch(self._pending_fn, batch))  # type: ignore
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch_fn: t.Callable,
+                         batch: t.Dict[t.Any, asyncio.Future]):
+        keys = list(batch)
+        try:
+            if asyncio.iscoroutinefunction(self.batch_fn):
+                results = await self.batch_fn(keys)
+            else:
+                executor = resolve(
+                    self.executor) if self.executor is not None else None
+                results = await asyncio.get_running_loop().run_in_executor(
+                    executor, batch_fn, keys)
+            values = scatter(keys, results)
+        except Exception as e:
+            for key, future in batch.items():
+                self._cache.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, value in zip(batch.values(), values):
+            # 调用方可能已取消等待
+            if not future.done():
+                future.set_result(value)
+
+    def clear(self, key: t.Any = None):
+        """ 清除记忆化结果,key为空时清除全部."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
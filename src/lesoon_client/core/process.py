@@ -0,0 +1,88 @@
+"""
+进程生命周期管理模块.
+gunicorn/uwsgi等预fork模型下,子进程继承的连接池与父进程共享套接字,
+继承的线程池其工作线程在子进程中并不存在,需在子进程中重新创建.
+"""
+import logging
+import os
+import threading
+import typing as t
+import weakref
+
+T = t.TypeVar('T')
+
+log = logging.getLogger(__name__)
+
+# fork后需在子进程中重置的对象,对象需实现 after_fork 方法
+_after_fork_registry: 'weakref.WeakSet[t.Any]' = weakref.WeakSet()
+
+
+def register_after_fork(obj: t.Any):
+    """ 注册fork后在子进程中调用 obj.after_fork() 的对象,对象被回收后自动注销."""
+    _after_fork_registry.add(obj)
+
+
+def _run_after_fork():
+    for obj in list(_after_fork_registry):
+        try:
+            obj.after_fork()
+        except Exception as e:
+            log.warning(f'fork后重置{obj!r}异常:{e}')
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_run_after_fork)
+
+
+class ProcessLocal(t.Generic[T]):
+    """
+    进程内单例.
+    首次访问时通过工厂函数创建,fork后的子进程中首次访问时重新创建;
+    指定reset时子进程沿用父进程已创建的对象(保留其配置),仅在首次访问时调用reset重置.
+    可作为类属性(描述符)使用,通过类或实例访问时均返回当前进程内的对象.
+
+    Attributes:
+        factory: 工厂函数
+        reset: 子进程中重置父进程对象的函数,如关闭继承的连接池
+    """
+
+    def __init__(self,
+                 factory: t.Callable[[], T],
+                 reset: t.Optional[t.Callable[[T], t.Any]] = None):
+        self.factory = factory
+        self.reset = reset
+        self._value: t.Optional[T] = None
+        self._pid: t.Optional[int] = None
+        self._lock = threading.Lock()
+        register_after_fork(self)
+
+    def get(self) -> T:
+        # 以进程号判断,未触发fork钩子的场景(如直接调用os.fork的C扩展)下同样有效
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    if self._value is not None and self.reset is not None:
+                        self.reset(self._value)
+                    else:
+                        self._value = self.factory()
+                    self._pid = pid
+        return self._value  # type: ignore
+
+    def __get__(self, instance: t.Any, owner: t.Any) -> T:
+        return self.get()
+
+    def after_fork(self):
+        # fork时其他线程可能持有锁,子进程中需重建;
+        # 父进程的对象仅丢弃引用不做关闭,指定reset时保留并在首次访问时重置
+        self._lock = threading.Lock()
+        if self.reset is None:
+            self._value = None
+            self._pid = None
+
+
+def resolve(value: t.Union[T, ProcessLocal[T]]) -> T:
+    """ 获取当前进程内的对象."""
+    if isinstance(value, ProcessLocal):
+        return value.get()
+    return value
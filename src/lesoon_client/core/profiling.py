@@ -0,0 +1,133 @@
+""" 调用耗时分析模块."""
+import collections
+import threading
+import time
+import typing as t
+
+from lesoon_client.core.process import register_after_fork
+
+
+class CallProfile:
+    """
+    单次调用的耗时记录.
+
+    Attributes:
+        method: 请求方法
+        url: 请求地址,请求地址构建前为资源路径
+        started_at: 调用开始时间戳
+        stages: 各阶段耗时(秒) [(阶段, 耗时)]
+        elapsed: 总耗时(秒)
+        request_size: 请求体大小(字节)
+        response_size: 响应体大小(字节)
+        error: 异常信息
+    """
+    __slots__ = ('method', 'url', 'started_at', 'stages', 'elapsed',
+                 'request_size', 'response_size', 'error', '_last')
+
+    def __init__(self, method: str, url: str):
+        self.method = method
+        self.url = url
+        self.started_at = time.time()
+        self.stages: t.List[t.Tuple[str, float]] = []
+        self.elapsed = 0.0
+        self.request_size: t.Optional[int] = None
+        self.response_size: t.Optional[int] = None
+        self.error: t.Optional[str] = None
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def to_dict(self) -> dict:
+        return {
+            'method': self.method,
+            'url': self.url,
+            'startedAt': self.started_at,
+            'elapsedMs': self.elapsed * 1000,
+            'stagesMs': {stage: cost * 1000 for stage, cost in self.stages},
+            'requestSize': self.request_size,
+            'responseSize': self.response_size,
+            'error': self.error,
+        }
+
+
+class CallProfiler:
+    """
+    调用耗时分析器.
+    记录每次调用各处理阶段的耗时,超过阈值的调用保存至定长的环形缓冲区.
+    阶段包括: pre_request  请求前预处理(init_app,token,请求头继承)
+             network      网络调用
+             decode       结果解析
+             handle_result 结果处理(load_response等)
+             其余耗时(日志等)计入 total 与各阶段之和的差值
+
+    Attributes:
+        threshold: 慢调用阈值(秒)
+        slow_calls: 慢调用记录
+    """
+
+    def __init__(self, threshold: float = 1.0, maxlen: int = 100):
+        self.threshold = threshold
+        self.slow_calls: t.Deque[CallProfile] = collections.deque(maxlen=maxlen)
+        self._local = threading.local()
+        register_after_fork(self)
+
+    def after_fork(self):
+        # 子进程中仅保留本进程的调用记录
+        self.slow_calls.clear()
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> t.List[CallProfile]:
+        # 重试等场景下调用会嵌套,按栈管理
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @property
+    def current(self) -> t.Optional[CallProfile]:
+        stack = self._stack
+        return stack[-1] if stack else None
+
+    def begin(self, method: str, url: str):
+        self._stack.append(CallProfile(method.upper(), url))
+
+    def mark(self, stage: str, **info):
+        """
+        记录阶段耗时.
+
+        Args:
+            stage: 阶段名称
+            info: 调用信息,如url/request_size/response_size
+
+        """
+        profile = self.current
+        if profile is not None:
+            profile.mark(stage)
+            for k, v in info.items():
+                setattr(profile, k, v)
+
+    def end(self, error: t.Optional[BaseException] = None):
+        profile = self._stack.pop()
+        profile.elapsed = time.perf_counter() - profile._last + sum(
+            cost for _, cost in profile.stages)
+        if error is not None:
+            profile.error = repr(error)
+        if profile.elapsed >= self.threshold:
+            self.slow_calls.append(profile)
+
+    def get_slow_calls(self) -> t.List[dict]:
+        return [profile.to_dict() for profile in list(self.slow_calls)]
+
+    def clear(self):
+        self.slow_calls.clear()
+
+    def init_app(self, app: t.Any, rule: str = '/debug/client/slowCalls'):
+        """ 注册查询慢调用的调试接口."""
+        app.add_url_rule(
+            rule,
+            endpoint='lesoon_client_slow_calls',
+            view_func=lambda: {'slowCalls': self.get_slow_calls()})
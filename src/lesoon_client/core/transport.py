@@ -0,0 +1,561 @@
+""" 请求传输层模块."""
+import base64
+import functools
+import hashlib
+import inspect
+import json
+import os
+import typing as t
+from collections.abc import Mapping
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.models import RequestEncodingMixin
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from lesoon_client.core.process import ProcessLocal
+from lesoon_client.core.process import register_after_fork
+from lesoon_client.core.process import resolve
+
+# requests.Request所支持的请求参数
+REQUEST_PARAM_KEYS = ('headers', 'files', 'data', 'params', 'auth', 'cookies',
+                      'json')
+
+# 发送函数: 发送已查找过缓存等的请求
+SendFn = t.Callable[[], requests.Response]
+
+# 精简编码无法处理的请求参数,出现时退回requests的编码规则
+LEAN_UNSUPPORTED_KEYS = ('files', 'auth', 'cookies')
+
+# 精简传输层不支持的单次调用连接参数及其默认值,需在创建连接池/客户端时指定
+LEAN_CONNECTION_DEFAULTS: t.Dict[str, t.Any] = {
+    'verify': True,
+    'cert': None,
+    'proxies': {},
+    'stream': False
+}
+
+
+class BaseTransport:
+    """
+    传输层基类.
+    负责将请求发送至远端并返回 :class:`requests.Response`,
+    上层的结果处理以及异常语义均不依赖于具体的传输实现.
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        发送请求.
+
+        Args:
+            method: 请求方式 GET/POST/PUT/DELETE...
+            url: 请求地址
+            kwargs: 请求参数以及自定义拓展参数,传输层需忽略无法识别的参数
+
+        """
+        raise NotImplementedError
+
+    def lookup(self, method: str, url: str,
+               **kwargs) -> t.Tuple[t.Optional[requests.Response], SendFn]:
+        """
+        查找无需网络调用即可得到的响应(如未过期的缓存).
+
+        Returns:
+            (响应, 发送函数): 没有可用的响应时响应为None,需调用发送函数发送请求,
+            发送函数沿用本次查找的结果,不会重复查找
+
+        """
+        return None, functools.partial(self.request, method, url, **kwargs)
+
+    @staticmethod
+    def prepare(method: str, url: str, **kwargs) -> requests.PreparedRequest:
+        """ 按requests的编码规则构建请求."""
+        return requests.Request(
+            method=method.upper(),
+            url=url,
+            **{k: kwargs[k] for k in REQUEST_PARAM_KEYS if k in kwargs
+              }).prepare()
+
+    @staticmethod
+    def build_response(request: t.Optional[requests.PreparedRequest],
+                       status_code: int,
+                       reason: str,
+                       headers: t.Any,
+                       content: bytes,
+                       url: t.Optional[str] = None) -> requests.Response:
+        """ 构建 :class:`requests.Response`,保证各传输实现的返回一致."""
+        res = requests.Response()
+        res.status_code = status_code
+        res.reason = reason
+        res.headers = CaseInsensitiveDict(headers)
+        res._content = content
+        res.encoding = get_encoding_from_headers(res.headers)
+        if request is not None:
+            res.request = request
+            res.url = t.cast(str, request.url)
+        if url is not None:
+            res.url = url
+        return res
+
+
+def close_adapters(session: requests.Session):
+    """ 关闭会话各适配器的连接池,会话的请求头/认证/挂载的适配器等配置保持不变."""
+    for adapter in session.adapters.values():
+        adapter.close()
+
+
+class SessionTransport(BaseTransport):
+    """
+    基于 :class:`requests.Session` 的传输层.
+    未指定会话时按进程懒创建;fork后的子进程沿用父进程的会话,仅清空其连接池.
+
+    Attributes:
+        session: 请求会话
+    """
+
+    def __init__(self,
+                 session: t.Union[requests.Session,
+                                  ProcessLocal[requests.Session], None] = None):
+        self._session = session if session is not None else ProcessLocal(
+            requests.Session, reset=close_adapters)
+        session_cls: t.Type[requests.Session] = requests.Session
+        if not isinstance(self._session, ProcessLocal):
+            register_after_fork(self)
+            session_cls = type(self._session)
+        # http.request函数签名所定义的参数
+        self._param_keys = frozenset(
+            inspect.signature(session_cls.request).parameters.keys())
+
+    @property
+    def session(self) -> requests.Session:
+        return resolve(self._session)
+
+    def after_fork(self):
+        close_adapters(self.session)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(
+            method=method,
+            url=url,
+            **{k: v for k, v in kwargs.items() if k in self._param_keys})
+
+
+class WSGITransport(BaseTransport):
+    """
+    内存传输层.
+    直接调用WSGI应用(如Flask)处理请求,不经过网络.
+    与requests一致,allow_redirects为True(默认)时跟随重定向.
+
+    Attributes:
+        app: WSGI应用
+    """
+
+    def __init__(self, app: t.Callable):
+        self.app = app
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        prepared = self.prepare(method, url, **kwargs)
+        res = self._send(prepared)
+        if not kwargs.get('allow_redirects', True):
+            return res
+
+        history: t.List[requests.Response] = []
+        while res.is_redirect:
+            if len(history) >= requests.models.DEFAULT_REDIRECT_LIMIT:
+                raise requests.TooManyRedirects(
+                    f'重定向次数超过{requests.models.DEFAULT_REDIRECT_LIMIT}次',
+                    response=res)
+            history.append(res)
+            prepared = self._redirect(prepared, res)
+            res = self._send(prepared)
+        res.history = history
+        return res
+
+    @staticmethod
+    def _redirect(prepared: requests.PreparedRequest,
+                  res: requests.Response) -> requests.PreparedRequest:
+        """ 按requests的规则构建重定向请求."""
+        redirected = prepared.copy()
+        redirected.prepare_url(
+            urljoin(t.cast(str, prepared.url), res.headers['Location']), None)
+        if res.status_code not in (307, 308):
+            # 301(POST)/302/303重定向改为GET并丢弃请求体
+            if (res.status_code in (302, 303) and prepared.method != 'HEAD' or
+                    res.status_code == 301 and prepared.method == 'POST'):
+                redirected.method = 'GET'
+            redirected.body = None
+            for key in ('Content-Type', 'Content-Length', 'Transfer-Encoding'):
+                redirected.headers.pop(key, None)
+        return redirected
+
+    def _send(self, prepared: requests.PreparedRequest) -> requests.Response:
+        from werkzeug.test import EnvironBuilder
+        from werkzeug.test import run_wsgi_app
+
+        parts = urlsplit(t.cast(str, prepared.url))
+        builder = EnvironBuilder(
+            path=parts.path or '/',
+            base_url=f'{parts.scheme}://{parts.netloc}',
+            query_string=parts.query,
+            method=prepared.method or 'GET',
+            headers=list(prepared.headers.items()),
+            data=prepared.body)
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        app_iter, status, headers = run_wsgi_app(
+            self.app, environ, buffered=True)
+        try:
+            content = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        status_code, _, reason = status.partition(' ')
+        return self.build_response(prepared, int(status_code), reason,
+                                   list(headers), content)
+
+
+class RecordReplayTransport(BaseTransport):
+    """
+    录制/回放传输层.
+    将真实响应录制到磁盘,之后可在无网络的情况下确定性地回放.
+    录制以 请求方式+请求地址(含查询参数)+请求体 作为键,不包含请求头.
+
+    Attributes:
+        path: 录制文件目录
+        transport: 实际发送请求的传输层,回放模式下可为空
+        mode: record 透传请求并录制响应
+              replay 仅回放,未录制的请求抛出 :class:`requests.ConnectionError`
+              auto   已录制则回放,否则透传并录制
+    """
+    MODES = ('record', 'replay', 'auto')
+
+    def __init__(self,
+                 path: str,
+                 transport: t.Optional[BaseTransport] = None,
+                 mode: str = 'auto'):
+        if mode not in self.MODES:
+            raise ValueError(f'不支持的录制模式:{mode}')
+        if mode != 'replay' and transport is None:
+            raise ValueError(f'{mode}模式下transport不能为空')
+        self.path = path
+        self.transport = transport
+        self.mode = mode
+        # 已加载的录制,避免回放时重复读盘
+        self._records: t.Dict[str, dict] = {}
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def record_key(prepared: requests.PreparedRequest) -> str:
+        body = prepared.body or b''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha1(f'{prepared.method} {prepared.url}\n'.encode())
+        digest.update(body)
+        return digest.hexdigest()
+
+    def _record_file(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.json')
+
+    def _load(self, key: str) -> t.Optional[dict]:
+        if key not in self._records:
+            try:
+                with open(self._record_file(key), encoding='utf-8') as f:
+                    self._records[key] = json.load(f)
+            except FileNotFoundError:
+                return None
+        return self._records[key]
+
+    def _dump(self, key: str, prepared: requests.PreparedRequest,
+              res: requests.Response):
+        record = {
+            'method': prepared.method,
+            'url': prepared.url,
+            'status_code': res.status_code,
+            'reason': res.reason,
+            'headers': dict(res.headers),
+        }
+        try:
+            record['content'] = res.content.decode('utf-8')
+        except UnicodeDecodeError:
+            record['content_b64'] = base64.b64encode(res.content).decode()
+        # 先写临时文件再替换,避免并发录制时读到不完整的文件
+        tmp_file = f'{self._record_file(key)}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self._record_file(key))
+        self._records[key] = record
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        prepared = self.prepare(method, url, **kwargs)
+        key = self.record_key(prepared)
+
+        if self.mode != 'record':
+            record = self._load(key)
+            if record is not None:
+                if 'content' in record:
+                    content = record['content'].encode('utf-8')
+                else:
+                    content = base64.b64decode(record['content_b64'])
+                return self.build_response(prepared, record['status_code'],
+                                           record['reason'], record['headers'],
+                                           content)
+            if self.mode == 'replay':
+                raise requests.ConnectionError(
+                    f'未找到录制的响应: {prepared.method} {prepared.url}',
+                    request=prepared)
+
+        res = self.transport.request(method, url, **kwargs)  # type: ignore
+        self._dump(key, prepared, res)
+        return res
+
+
+def _split_timeout(timeout: t.Any) -> t.Tuple[t.Any, t.Any]:
+    """ 将requests风格的timeout拆分为(连接超时,读取超时)."""
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+# requests编码params/data的规则(忽略值为None的项)
+_encode_params = RequestEncodingMixin._encode_params  # type: ignore
+
+
+class LeanTransport(BaseTransport):
+    """
+    精简编码传输层基类.
+    不经过requests的请求构建(hooks,cookies,环境变量合并等),
+    仅按requests的规则编码 params/data/json/headers.
+    单次调用的verify/cert/proxies/stream参数不被支持,传入非默认值时抛出ValueError.
+    """
+
+    def encode(self, method: str, url: str,
+               **kwargs) -> t.Tuple[str, CaseInsensitiveDict, t.Any]:
+        """
+        编码请求.
+
+        Returns:
+            (请求地址, 请求头, 请求体)
+
+        """
+        unsupported = [
+            k for k, default in LEAN_CONNECTION_DEFAULTS.items()
+            if kwargs.get(k) not in (None, default)
+        ]
+        if unsupported:
+            raise ValueError(f'{type(self).__name__}不支持单次调用的参数:{unsupported},'
+                             '请在创建传输层时指定')
+
+        if self._needs_prepare(url, **kwargs):
+            prepared = self.prepare(method, url, **kwargs)
+            return t.cast(str, prepared.url), prepared.headers, prepared.body
+
+        headers = CaseInsensitiveDict(kwargs.get('headers') or {})
+
+        params = kwargs.get('params')
+        if params:
+            if isinstance(params, bytes):
+                params = params.decode('utf-8')
+            query = _encode_params(params)
+            if query:
+                url += '?' + query
+
+        body = None
+        data = kwargs.get('data')
+        if data:
+            body = _encode_params(data)
+            if not isinstance(data, (str, bytes)):
+                headers.setdefault('Content-Type',
+                                   'application/x-www-form-urlencoded')
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+        elif kwargs.get('json') is not None:
+            body = json.dumps(kwargs['json'], allow_nan=False).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/json')
+        return url, headers, body
+
+    @staticmethod
+    def _needs_prepare(url: str, **kwargs) -> bool:
+        """ 是否需退回requests的编码规则."""
+        if any(kwargs.get(k) for k in LEAN_UNSUPPORTED_KEYS):
+            return True
+        # 地址已带查询参数/锚点时需合并查询参数
+        if kwargs.get('params') and ('?' in url or '#' in url):
+            return True
+        # 文件/生成器等流式请求体
+        data = kwargs.get('data')
+        return bool(data) and not isinstance(data,
+                                             (str, bytes, Mapping, list, tuple))
+
+
+class Urllib3Transport(LeanTransport):
+    """
+    基于 :class:`urllib3.PoolManager` 的传输层.
+    证书校验等连接参数需在创建PoolManager时指定,不支持单次调用的verify/cert.
+    未指定连接池时按进程创建,指定的连接池fork后在子进程中清空.
+
+    Attributes:
+        pool: 连接池
+    """
+
+    def __init__(self, pool: t.Any = None, **pool_kwargs):
+        self._pool: t.Union[urllib3.PoolManager,
+                            ProcessLocal[urllib3.PoolManager]]
+        if pool is None:
+            self._pool = ProcessLocal[urllib3.PoolManager](
+                lambda: urllib3.PoolManager(**pool_kwargs))
+        else:
+            self._pool = pool
+            register_after_fork(self)
+        # 与requests一致:连接失败不重试,重定向由连接池跟随
+        self.retries = urllib3.Retry(
+            total=None, connect=0, read=False, redirect=30)
+
+    @property
+    def pool(self) -> urllib3.PoolManager:
+        return resolve(self._pool)
+
+    def after_fork(self):
+        self.pool.clear()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        url, headers, body = self.encode(method, url, **kwargs)
+        timeout = kwargs.get('timeout')
+        if timeout is not None:
+            connect, read = _split_timeout(timeout)
+            timeout = urllib3.Timeout(connect=connect, read=read)
+        else:
+            timeout = urllib3.Timeout.DEFAULT_TIMEOUT
+        try:
+            resp = self.pool.urlopen(
+                method.upper(),
+                url,
+                body=body,
+                headers=dict(headers),
+                timeout=timeout,
+                retries=self.retries,
+                redirect=kwargs.get('allow_redirects', True),
+                preload_content=True)
+        except urllib3.exceptions.MaxRetryError as e:
+            raise self._convert_error(e.reason or e) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise self._convert_error(e) from e
+        return self.build_response(
+            None,
+            resp.status,
+            resp.reason or '',
+            resp.headers,
+            resp.data,
+            url=url)
+
+    @staticmethod
+    def _convert_error(e: Exception) -> requests.RequestException:
+        """ 转换为requests异常,保持上层异常语义一致."""
+        # NewConnectionError继承自ConnectTimeoutError,与requests一致视为连接异常
+        if isinstance(e, urllib3.exceptions.NewConnectionError):
+            return requests.ConnectionError(e)
+        if isinstance(e, urllib3.exceptions.ConnectTimeoutError):
+            return requests.ConnectTimeout(e)
+        if isinstance(e, urllib3.exceptions.TimeoutError):
+            return requests.ReadTimeout(e)
+        # 未设置状态码重试,ResponseError仅由重定向次数超限引起
+        if isinstance(e, urllib3.exceptions.ResponseError):
+            return requests.TooManyRedirects(e)
+        if isinstance(e, urllib3.exceptions.DecodeError):
+            return requests.exceptions.ContentDecodingError(e)
+        return requests.ConnectionError(e)
+
+
+class HttpxTransport(LeanTransport):
+    """
+    基于 :class:`httpx.Client` 的传输层,需安装httpx(HTTP/2需安装httpx[http2]).
+    未指定客户端时按进程创建;指定的客户端无法在fork后重置,需由调用方保证在子进程中创建.
+
+    Attributes:
+        client: httpx客户端
+    """
+
+    def __init__(self,
+                 client: t.Any = None,
+                 http2: bool = False,
+                 **client_kwargs):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError('使用HttpxTransport需安装httpx: '
+                              'pip install lesoon-client[httpx]') from e
+        self._client = client or ProcessLocal(
+            lambda: httpx.Client(http2=http2, **client_kwargs))
+
+    @property
+    def client(self) -> t.Any:
+        return resolve(self._client)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        import httpx
+
+        url, headers, body = self.encode(method, url, **kwargs)
+        timeout = kwargs.get('timeout')
+        if timeout is not None:
+            connect, read = _split_timeout(timeout)
+            timeout = httpx.Timeout(read, connect=connect)
+        else:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        try:
+            resp = self.client.request(
+                method.upper(),
+                url,
+                headers=dict(headers),
+                content=body,
+                timeout=timeout,
+                follow_redirects=kwargs.get('allow_redirects', True))
+        except httpx.ConnectTimeout as e:
+            raise requests.ConnectTimeout(e) from e
+        except httpx.TimeoutException as e:
+            raise requests.ReadTimeout(e) from e
+        except httpx.TooManyRedirects as e:
+            raise requests.TooManyRedirects(e) from e
+        except httpx.DecodingError as e:
+            raise requests.exceptions.ContentDecodingError(e) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e) from e
+        except httpx.RequestError as e:
+            raise requests.RequestException(e) from e
+        return self.build_response(
+            None,
+            resp.status_code,
+            resp.reason_phrase,
+            resp.headers.multi_items(),
+            resp.content,
+            url=str(resp.url))
+
+
+TRANSPORTS: t.Dict[str, t.Type[BaseTransport]] = {
+    'requests': SessionTransport,
+    'urllib3': Urllib3Transport,
+    'httpx': HttpxTransport,
+}
+
+# 进程内共享的传输层,同一后端复用连接池
+_shared_transports: t.Dict[str, BaseTransport] = {}
+
+
+def get_transport(name: str) -> BaseTransport:
+    """
+    按后端名称获取进程内共享的传输层.
+
+    Args:
+        name: requests/urllib3/httpx
+
+    """
+    if name not in TRANSPORTS:
+        raise ValueError(f'不支持的传输层:{name},可选值:{list(TRANSPORTS)}')
+    if name not in _shared_transports:
+        _shared_transports[name] = TRANSPORTS[name]()
+    return _shared_transports[name]
@@ -1,6 +1,7 @@
 import json
 import typing as t
 
+from flask import copy_current_request_context
 from flask.logging import default_handler
 from lesoon_common import ClientResponse
 from lesoon_common import LesoonFlask
@@ -11,18 +12,26 @@ from lesoon_common.ctx import has_app_context
 from lesoon_common.ctx import has_request_context
 from lesoon_common.dataclass.base import BaseDataClass
 from lesoon_common.dataclass.req import PageParam
-from lesoon_common.dataclass.user import TokenUser
 from lesoon_common.globals import current_app
 from lesoon_common.globals import request
 from lesoon_common.response import ResponseBase
-from lesoon_common.utils.jwt import create_token
-from lesoon_common.utils.jwt import get_token
-from opentracing.propagation import Format
 from werkzeug.exceptions import ServiceUnavailable
 
 from lesoon_client.core.base import BaseClient
 from lesoon_client.core.exceptions import ClientException
-from lesoon_client.core.exceptions import RemoteCallError
+from lesoon_client.core.limiter import AdaptiveLimiter
+from lesoon_client.core.loader import AsyncBatchLoader
+from lesoon_client.core.loader import BatchLoader
+from lesoon_client.wrappers.exceptions import RemoteCallError
+
+# 请求上下文中缓存待继承请求头的键
+PROPAGATED_HEADERS_KEY = 'lesoon_client.propagated_headers'
+
+# 自定义继承的请求头
+CUSTOM_HEADER_KEYS = ('user-speciality',)
+
+# istio规范的链路跟踪请求头
+ISTIO_HEADER_KEYS = ('x-request-id', 'x-ot-span-context')
 
 
 class LesoonClient(BaseClient):
@@ -51,6 +60,8 @@ class LesoonClient(BaseClient):
         初始化client配置
         支持通过provider指定不同的client使用不同的url_prefix
         e.g.: {'PROVIDER_URLS':{'xxx-api':'http://locahost:5000'}}
+        支持通过ADAPTIVE_LIMIT开启按provider的自适应并发限制,值为限制器参数
+        e.g.: {'ADAPTIVE_LIMIT':{'initial_limit':20,'max_wait':0.1}}
         """
         self.logger_handler = default_handler
         current_app.config.setdefault('CLIENT', self._default_config())
@@ -65,16 +76,42 @@ class LesoonClient(BaseClient):
         if not self.base_url:
             self.log.warning(f'Client中的{self.provider}调用路径为空，请检查相关配置')
 
+        if self.limiter is None and client_config.get('ADAPTIVE_LIMIT'):
+            self.limiter = self._provider_limiter(
+                client_config['ADAPTIVE_LIMIT'])
+
         if 'lesoon-client' not in current_app.extensions:
             current_app.extensions['lesoon-client'] = {}
         current_app.extensions['lesoon-client'][self.provider] = self
 
+    def _provider_limiter(self, limit_config: t.Any) -> AdaptiveLimiter:
+        """ 获取provider的自适应并发限制器,同一provider的client共用."""
+        limiters = current_app.extensions.setdefault('lesoon-client-limiters',
+                                                     {})
+        if self.provider not in limiters:
+            kwargs = limit_config if isinstance(limit_config, dict) else {}
+            limiters.setdefault(self.provider, AdaptiveLimiter(**kwargs))
+        return limiters[self.provider]
+
+    @staticmethod
+    def limiter_stats() -> dict:
+        """ 各provider当前的并发限制以及拒绝次数."""
+        limiters = current_app.extensions.get('lesoon-client-limiters', {})
+        return {
+            provider: limiter.stats() for provider, limiter in limiters.items()
+        }
+
     @staticmethod
     def _default_config() -> dict:
-        return {'BASE_URL': '', 'PROVIDER_URLS': {}}
+        return {'BASE_URL': '', 'PROVIDER_URLS': {}, 'PROPAGATE_HEADERS': []}
 
     @staticmethod
     def set_token(kwargs):
+        # jwt相关依赖仅在开启JWT时加载
+        from lesoon_common.dataclass.user import TokenUser
+        from lesoon_common.utils.jwt import create_token
+        from lesoon_common.utils.jwt import get_token
+
         # 请求token
         token = ''
         try:
@@ -83,32 +120,76 @@ class LesoonClient(BaseClient):
             pass
         kwargs['headers']['token'] = token or create_token(TokenUser.new())
 
+    def propagated_headers(self) -> t.Tuple[dict, dict]:
+        """
+        当前入站请求需继承至下游调用的请求头.
+        每个入站请求仅计算一次,结果缓存于请求上下文(request.environ)中,
+        同一请求内的多次下游调用直接复用.
+
+        Returns:
+            (自定义请求头, 链路跟踪请求头)
+
+        """
+        if not has_request_context():
+            return {}, {}
+        return (self._propagated('custom', self._collect_custom_headers),
+                self._propagated('trace', self._collect_trace_headers))
+
     @staticmethod
-    def inherit_custom_headers(kwargs):
-        """ 从headers继承自定义的key-value."""
-        if has_request_context() and 'user-speciality' in request.headers.keys(
-        ):
-            kwargs['headers']['user-speciality'] = request.headers.get(
-                'user-speciality')
+    def _propagated(kind: str, collect: t.Callable[[], dict]) -> dict:
+        """ 按类别(custom/trace)获取请求上下文中缓存的请求头,未缓存时收集."""
+        cache = request.environ.setdefault(PROPAGATED_HEADERS_KEY, {})
+        if kind not in cache:
+            cache[kind] = collect()
+        return cache[kind]
 
-    def inherit_trace_headers(self, kwargs):
-        """ 从headers继承链路跟踪的key-value."""
+    @staticmethod
+    def _collect_custom_headers() -> dict:
+        """ 收集自定义请求头,支持通过CLIENT.PROPAGATE_HEADERS配置额外的请求头."""
+        header_keys = list(CUSTOM_HEADER_KEYS)
+        if has_app_context():
+            client_config = current_app.config.get('CLIENT', {})
+            header_keys.extend(client_config.get('PROPAGATE_HEADERS', []))
+        headers = {}
+        for key in header_keys:
+            value = request.headers.get(key)
+            if value is not None:
+                headers[key] = value
+        return headers
+
+    def _collect_trace_headers(self) -> dict:
+        """ 收集链路跟踪请求头."""
+        headers: t.Dict[str, str] = {}
         try:
-            if has_request_context(
-            ) and 'link_tracer' in current_app.extensions:
+            if 'link_tracer' in current_app.extensions:
+                from opentracing.propagation import Format
+
                 # opentracing-B3规范请求头
                 link_tracer = current_app.extensions['link_tracer']
                 link_tracer.tracer.inject(
                     span_context=link_tracer.get_span().context,
                     format=Format.HTTP_HEADERS,
-                    carrier=kwargs['headers'])
+                    carrier=headers)
                 # istio规范请求头
-                incoming_header_keys = ['x-request-id', 'x-ot-span-context']
-                for key in incoming_header_keys:
+                for key in ISTIO_HEADER_KEYS:
                     if value := request.headers.get(key):
-                        kwargs['headers'][key] = value
+                        headers[key] = value
         except Exception as e:
             self.log.warning(f'拷贝链路跟踪请求头异常:{e}')
+        return headers
+
+    @staticmethod
+    def inherit_custom_headers(kwargs):
+        """ 从headers继承自定义的key-value."""
+        if has_request_context():
+            kwargs['headers'].update(
+                LesoonClient._propagated('custom',
+                                         LesoonClient._collect_custom_headers))
+
+    def inherit_trace_headers(self, kwargs):
+        """ 从headers继承链路跟踪的key-value."""
+        _, trace_headers = self.propagated_headers()
+        kwargs['headers'].update(trace_headers)
 
     def _handle_pre_request(self, method: str, kwargs: dict):
         """
@@ -223,6 +304,66 @@ class LesoonClient(BaseClient):
 
         return self.GET(rule=rule, **kwargs)
 
+    @staticmethod
+    def _bind_request_context(func: t.Callable) -> t.Callable:
+        # 批量调用在线程池中执行,需携带调用方的请求上下文以继承token与请求头
+        if has_request_context():
+            return copy_current_request_context(func)
+        return func
+
+    def loader(self,
+               rule: str,
+               key_field: str = 'id',
+               method: str = 'POST',
+               max_batch_size: int = 100,
+               wait: float = 0.005,
+               use_asyncio: bool = False,
+               **kwargs) -> t.Union[BatchLoader, AsyncBatchLoader]:
+        """
+        创建自动批量加载器,将逐个键的查询合并为对批量接口的一次调用.
+        批量接口以json接收键列表,返回的记录通过key_field与键对应,
+        未返回的键加载结果为None;调用失败(含503熔断)时抛出异常,失败的键不做记忆化.
+        加载器对相同的键只加载一次,建议按请求或业务作用域创建.
+        批量调用在加载器专用的线程池中执行,不占用 :attr:`BaseClient.executor`.
+
+        Args:
+            rule: 批量接口资源路径
+            key_field: 记录中与键对应的字段
+            method: 批量接口请求方式
+            max_batch_size: 单批次最大键数量
+            wait: 收集窗口(秒)
+            use_asyncio: 是否创建asyncio模式的加载器
+            kwargs: 参考 :func:`lesoonClient._request`
+
+        Returns:
+            `BatchLoader` 或 `AsyncBatchLoader`
+
+        e.g.:
+            loader = client.loader('/batchGet')
+            futures = [loader.load(id_) for id_ in ids]
+            rows = [f.result() for f in futures]
+        """
+
+        def batch_fn(keys: t.List[t.Any]) -> dict:
+            rows = self.request(method, rule, json=keys, **kwargs)
+            if isinstance(rows, ResponseBase):
+                # 503熔断时返回不含result的Response,需抛出异常以免将所有键记忆化为None
+                if rows.code != ResponseCode.Success.code or rows.result is None:
+                    raise RemoteCallError(
+                        client=self, errmsg=f'批量调用失败:{rows.msg}')
+                rows = rows.result
+            return {row[key_field]: row for row in rows or []}
+
+        # 调用方可能在BaseClient.executor的任务中等待加载结果,
+        # 与其共用线程池时可能耗尽线程导致死锁,因此使用加载器自身的线程池
+        loader_cls: t.Type[t.Union[BatchLoader, AsyncBatchLoader]]
+        loader_cls = AsyncBatchLoader if use_asyncio else BatchLoader
+        return loader_cls(
+            batch_fn,
+            max_batch_size=max_batch_size,
+            wait=wait,
+            bind=self._bind_request_context)
+
     def create(self, data: dict):
         return self.POST('', json=data)
 
@@ -0,0 +1,23 @@
+import typing as t
+
+import requests
+from lesoon_common import ServiceError
+from lesoon_common.code import ResponseCode
+
+from lesoon_client.core.exceptions import ClientException
+
+if t.TYPE_CHECKING:
+    from lesoon_client.wrappers.client import LesoonClient
+
+
+class RemoteCallError(ClientException, ServiceError):
+    CODE = ResponseCode.RemoteCallError
+
+    def __init__(self,
+                 client: 'LesoonClient',
+                 errmsg: t.Optional[str] = None,
+                 request: t.Optional[requests.Request] = None,
+                 response: t.Optional[requests.Response] = None):
+        ClientException.__init__(
+            self, client=client, request=request, response=response)
+        ServiceError.__init__(self, msg_detail=errmsg)
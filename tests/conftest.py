@@ -28,10 +28,15 @@ def app():
 
 
 @pytest.fixture
-def server(app):
+def api(app):
     api = Api(app)
     SimpleResource.api = None
     api.add_resource(SimpleResource)
+    yield api
+
+
+@pytest.fixture
+def server(app, api):
     srv = make_server(host='localhost', port=12345, app=app, threaded=True)
     t = threading.Thread(target=srv.serve_forever)
     t.start()
@@ -37,6 +37,12 @@ class SimpleResource(Resource):
     def delete(self):
         return self._original_request()
 
+    @Route.POST('/batchGet')
+    def batch_get(self):
+        return success_response(result=[{
+            'id': id_
+        } for id_ in request.get_json() if id_ > 0])
+
     @Route.GET('/standard')
     def standard(self):
         return success_response()
@@ -1,4 +1,6 @@
 import json
+import subprocess
+import sys
 
 import pytest
 
@@ -52,3 +54,21 @@ class TestBaseClient:
     def test_http_exception(self):
         with pytest.raises(ClientException):
             r = self.client.GET('/simple/httpException')
+
+
+def test_lazy_import():
+    # 在新进程中导入,避免受已加载模块影响
+    code = ('import sys, lesoon_client; lesoon_client.BaseClient; '
+            'print(sorted(m for m in ("flask", "lesoon_common", "opentracing") '
+            'if m in sys.modules))')
+    output = subprocess.run([sys.executable, '-c', code],
+                            check=True,
+                            capture_output=True,
+                            text=True).stdout
+    assert output.strip() == '[]'
+
+
+def test_remote_call_error_reexport():
+    from lesoon_client.core import exceptions
+    from lesoon_client.wrappers.exceptions import RemoteCallError
+    assert exceptions.RemoteCallError is RemoteCallError
@@ -0,0 +1,157 @@
+import json
+import uuid
+
+import pytest
+
+from lesoon_client import BaseClient
+from lesoon_client import LesoonClient
+from lesoon_client.core.cache import CachingTransport
+from lesoon_client.core.cache import DiskCache
+from lesoon_client.core.cache import USER_KEY_HEADERS
+from lesoon_client.core.transport import BaseTransport
+
+
+class CountingTransport(BaseTransport):
+    """ 返回带ETag的固定响应,并记录实际的调用."""
+
+    def __init__(self, etag: str = '"v1"', headers: dict = None):
+        self.etag = etag
+        self.headers = headers or {}
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        headers = kwargs.get('headers') or {}
+        self.calls.append(headers.get('If-None-Match'))
+        if headers.get('If-None-Match') == self.etag:
+            return self.build_response(None, 304, 'Not Modified', {}, b'')
+        content = json.dumps({'url': url, 'params': kwargs.get('params')})
+        return self.build_response(
+            None,
+            200,
+            'OK', {
+                'Content-Type': 'application/json',
+                'ETag': self.etag,
+                **self.headers
+            },
+            content.encode(),
+            url=url)
+
+
+class SimpleClient(BaseClient):
+    BASE_URL = 'http://testserver'
+    URL_PREFIX = '/codes'
+
+
+class TestCachingTransport:
+
+    @pytest.fixture
+    def backend(self):
+        return CountingTransport()
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return DiskCache(str(tmp_path / 'cache.db'), ttl=60)
+
+    def test_cache_hit(self, backend, cache):
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        first = client.GET('/', params={'type': 'org'})
+        second = client.GET('/', params={'type': 'org'})
+        assert first == second
+        assert len(backend.calls) == 1
+
+    def test_cache_key(self, backend, cache):
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        client.GET('/', params={'type': 'org'})
+        client.GET('/', params={'type': 'area'})
+        client.GET('/', params={'type': 'org'}, cache=False)
+        client.POST('/', params={'type': 'org'})
+        assert len(backend.calls) == 4
+
+    def test_shared_between_clients(self, backend, cache):
+        SimpleClient(transport=CachingTransport(backend, cache)).GET('/')
+        other = DiskCache(cache.path, ttl=60)
+        SimpleClient(transport=CachingTransport(backend, other)).GET('/')
+        assert len(backend.calls) == 1
+
+    def test_etag_revalidation(self, backend, cache):
+        cache.ttl = 0
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        first = client.GET('/')
+        second = client.GET('/')
+        assert first == second
+        assert backend.calls == [None, '"v1"']
+
+    def test_evict(self, backend, tmp_path):
+        cache = DiskCache(str(tmp_path / 'cache.db'), max_size=150)
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        for i in range(3):
+            client.GET('/', params={'i': i})
+        client.GET('/', params={'i': 0})
+        assert len(backend.calls) == 4
+
+    def test_key_headers(self, backend, cache):
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        client.GET('/', headers={'token': 'user-1'})
+        client.GET('/', headers={'token': 'user-2'})
+        assert len(backend.calls) == 1
+
+        transport = CachingTransport(
+            backend, cache, key_headers=USER_KEY_HEADERS)
+        client = SimpleClient(transport=transport)
+        client.GET('/', headers={'token': 'user-1'})
+        client.GET('/', headers={'token': 'user-2'})
+        client.GET('/', headers={'token': 'user-1'})
+        assert len(backend.calls) == 3
+
+        transport = CachingTransport(
+            backend, cache, key_headers=['x-tenant-id'])
+        client = SimpleClient(transport=transport)
+        client.GET('/', headers={'x-tenant-id': '1'})
+        client.GET('/', headers={'x-tenant-id': '2'})
+        assert len(backend.calls) == 5
+
+    def test_minted_token(self, app, backend, cache, monkeypatch):
+        # 无入站token时每次调用签发的token均不同
+        monkeypatch.setattr('lesoon_common.utils.jwt.create_token',
+                            lambda user: uuid.uuid4().hex)
+        app.config['JWT_ENABLE'] = True
+        client = LesoonClient(
+            base_url='http://testserver',
+            transport=CachingTransport(backend, cache))
+        first = client.GET('/codes', load_response=False)
+        second = client.GET('/codes', load_response=False)
+        assert first == second
+        assert len(backend.calls) == 1
+
+    @pytest.mark.parametrize('cache_control',
+                             ['no-store', 'private, max-age=60'])
+    def test_not_storable(self, cache, cache_control):
+        backend = CountingTransport(headers={'Cache-Control': cache_control})
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        client.GET('/')
+        client.GET('/')
+        assert len(backend.calls) == 2
+
+    def test_vary(self, cache):
+        backend = CountingTransport(headers={'Vary': 'Accept-Language'})
+        client = SimpleClient(transport=CachingTransport(backend, cache))
+        client.GET('/', headers={'Accept-Language': 'zh'})
+        client.GET('/', headers={'Accept-Language': 'zh'})
+        client.GET('/', headers={'Accept-Language': 'en'})
+        assert len(backend.calls) == 2
+
+    def test_lazy_access_update(self, backend, cache):
+        transport = CachingTransport(backend, cache)
+        SimpleClient(transport=transport).GET('/')
+        key = transport.cache_key('GET', 'http://testserver/codes/')
+
+        def accessed_at():
+            return cache.conn.execute(
+                'SELECT accessed_at FROM client_cache').fetchone()[0]
+
+        cache.conn.execute('UPDATE client_cache SET accessed_at = 0')
+        assert cache.get(key) is not None
+        assert accessed_at() > 0
+        cache.conn.execute('UPDATE client_cache SET accessed_at = 1e12')
+        assert cache.get(key) is not None
+        assert accessed_at() == 1e12
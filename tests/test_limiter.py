@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+from lesoon_client import BaseClient
+from lesoon_client.core.cache import CachingTransport
+from lesoon_client.core.cache import DiskCache
+from lesoon_client.core.exceptions import ClientException
+from lesoon_client.core.exceptions import ConcurrencyLimitExceeded
+from lesoon_client.core.limiter import AdaptiveLimiter
+from lesoon_client.core.transport import BaseTransport
+
+
+class StatusTransport(BaseTransport):
+    """ 返回指定状态码的响应."""
+
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+
+    def request(self, method, url, **kwargs):
+        return self.build_response(
+            None,
+            self.status_code,
+            '', {'Content-Type': 'application/json'},
+            b'{}',
+            url=url)
+
+
+class SimpleClient(BaseClient):
+    BASE_URL = 'http://testserver'
+
+
+class TestAdaptiveLimiter:
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+        for _ in range(3):
+            assert limiter.acquire()
+            limiter.release(0.01)
+        assert limiter.limit == 3
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+        limiter.acquire()
+        limiter.release(0.01, dropped=True)
+        assert limiter.limit == 5
+
+    def test_latency_decrease(self):
+        limiter = AdaptiveLimiter(
+            initial_limit=10, backoff_ratio=0.5, tolerance=2)
+        limiter.acquire()
+        limiter.release(0.01)
+        limiter.acquire()
+        limiter.release(1)
+        assert limiter.limit == 5
+
+    def test_latency_shift(self):
+        limiter = AdaptiveLimiter(initial_limit=50)
+
+        def run(rtt: float, rounds: int, concurrency: int = 40):
+            for _ in range(rounds):
+                acquired = sum(limiter.acquire() for _ in range(concurrency))
+                for _ in range(acquired):
+                    limiter.release(rtt)
+
+        run(0.01, 10)
+        # 耗时持续升高后基准随之升高,限制短暂回退后恢复
+        run(0.03, 50)
+        assert limiter.limit >= 50
+        assert limiter.stats()['rttMs'] == pytest.approx(30, rel=0.01)
+
+    def test_min_limit(self):
+        limiter = AdaptiveLimiter(initial_limit=2, min_limit=1)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.01, dropped=True)
+        assert limiter.limit == 1
+
+    def test_reject(self):
+        limiter = AdaptiveLimiter(initial_limit=1)
+        assert limiter.acquire()
+        assert not limiter.acquire()
+        assert limiter.stats()['rejected'] == 1
+        assert limiter.stats()['inFlight'] == 1
+
+    def test_queue(self):
+        limiter = AdaptiveLimiter(initial_limit=1, max_wait=5)
+        assert limiter.acquire()
+        threading.Timer(0.05, limiter.release, args=(0.01,)).start()
+        assert limiter.acquire()
+        assert limiter.stats()['rejected'] == 0
+
+
+class TestClientLimiter:
+
+    def test_success(self):
+        limiter = AdaptiveLimiter(initial_limit=1)
+        client = SimpleClient(transport=StatusTransport(), limiter=limiter)
+        client.GET('/')
+        assert limiter.stats()['inFlight'] == 0
+        assert limiter.stats()['rttMs'] is not None
+
+    def test_server_error(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+        client = SimpleClient(transport=StatusTransport(503), limiter=limiter)
+        with pytest.raises(ClientException):
+            client.GET('/')
+        assert limiter.limit == 5
+        assert limiter.stats()['inFlight'] == 0
+
+    def test_client_error(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+        client = SimpleClient(transport=StatusTransport(404), limiter=limiter)
+        with pytest.raises(ClientException):
+            client.GET('/')
+        assert limiter.limit == 10
+
+    def test_reject(self):
+        limiter = AdaptiveLimiter(initial_limit=1)
+        limiter.acquire()
+        client = SimpleClient(transport=StatusTransport(), limiter=limiter)
+        with pytest.raises(ConcurrencyLimitExceeded):
+            client.GET('/')
+
+    def test_cache_hit(self, tmp_path):
+        limiter = AdaptiveLimiter(initial_limit=1)
+        cache = DiskCache(str(tmp_path / 'cache.db'))
+        client = SimpleClient(
+            transport=CachingTransport(StatusTransport(), cache),
+            limiter=limiter)
+        client.GET('/')
+        rtt = limiter.stats()['rttMs']
+        # 缓存命中不占用并发名额,也不计入往返耗时
+        limiter.acquire()
+        client.GET('/')
+        assert limiter.stats()['rttMs'] == rtt
+        assert limiter.stats()['rejected'] == 0
+
+    def test_single_lookup(self, tmp_path, monkeypatch):
+        cache = DiskCache(str(tmp_path / 'cache.db'))
+        lookups = []
+        get = cache.get
+        monkeypatch.setattr(cache, 'get',
+                            lambda key: lookups.append(key) or get(key))
+        client = SimpleClient(
+            transport=CachingTransport(StatusTransport(), cache),
+            limiter=AdaptiveLimiter())
+        # 未命中时发送请求沿用查找结果,不再重复查找
+        client.GET('/')
+        client.GET('/')
+        assert len(lookups) == 2
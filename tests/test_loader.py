@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import weakref
+
+import pytest
+
+from lesoon_client.core.loader import AsyncBatchLoader
+from lesoon_client.core.loader import batch_executor
+from lesoon_client.core.loader import BatchLoader
+
+
+class BatchSource:
+    """ 记录批量调用的数据源."""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, keys):
+        with self.lock:
+            self.batches.append(keys)
+        return {key: {'id': key} for key in keys if key != 'missing'}
+
+
+class TestBatchLoader:
+
+    def test_batch(self):
+        source = BatchSource()
+        loader = BatchLoader(source, wait=0.01)
+        futures = loader.load_many([1, 2, 3, 'missing'])
+        assert [f.result(timeout=1) for f in futures] == [{
+            'id': 1
+        }, {
+            'id': 2
+        }, {
+            'id': 3
+        }, None]
+        assert source.batches == [[1, 2, 3, 'missing']]
+
+    def test_memoization(self):
+        source = BatchSource()
+        loader = BatchLoader(source)
+        assert loader.load(1) is loader.load(1)
+        loader.load(1).result(timeout=1)
+        loader.load(1).result(timeout=1)
+        assert source.batches == [[1]]
+
+        loader.clear()
+        loader.load(1).result(timeout=1)
+        assert len(source.batches) == 2
+
+    def test_max_batch_size(self):
+        source = BatchSource()
+        loader = BatchLoader(source, max_batch_size=2, wait=10)
+        futures = loader.load_many([1, 2, 3, 4])
+        assert [f.result(timeout=1)['id'] for f in futures] == [1, 2, 3, 4]
+        assert source.batches == [[1, 2], [3, 4]]
+
+    def test_scope(self):
+        source = BatchSource()
+        loader = BatchLoader(source, wait=10)
+        with loader.scope():
+            future = loader.load(1)
+        assert future.result(timeout=1) == {'id': 1}
+        assert loader.load(1) is not future
+
+    def test_error(self):
+
+        def batch_fn(keys):
+            raise ValueError('batch error')
+
+        loader = BatchLoader(batch_fn)
+        future = loader.load(1)
+        with pytest.raises(ValueError):
+            future.result(timeout=1)
+        assert loader.load(1) is not future
+
+    def test_bind(self):
+        bound = []
+
+        def bind(func):
+            bound.append(threading.current_thread())
+            return func
+
+        loader = BatchLoader(BatchSource(), bind=bind)
+        loader.load(1).result(timeout=1)
+        assert bound == [threading.current_thread()]
+
+    def test_shared_threads(self):
+        BatchLoader(BatchSource()).load(0).result(timeout=1)
+        threads = set(threading.enumerate())
+        refs = []
+        for i in range(50):
+            loader = BatchLoader(BatchSource())
+            with loader.scope():
+                assert loader.load(i).result(timeout=1) == {'id': i}
+            refs.append(weakref.ref(loader))
+            assert loader.executor is batch_executor.get()
+        del loader
+        # 各加载器共享线程池与调度线程,不按加载器或收集窗口创建线程
+        new_threads = set(threading.enumerate()) - threads
+        assert all(th.name.startswith('batch_loader') for th in new_threads)
+        assert not any(isinstance(th, threading.Timer) for th in new_threads)
+        assert sum(ref() is not None for ref in refs) <= 2
+
+
+class TestAsyncBatchLoader:
+
+    def test_batch(self):
+        source = BatchSource()
+
+        async def main():
+            loader = AsyncBatchLoader(source)
+            first = await loader.load_many([1, 2, 'missing'])
+            second = await asyncio.gather(loader.load(1), loader.load(3))
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first == [{'id': 1}, {'id': 2}, None]
+        assert second == [{'id': 1}, {'id': 3}]
+        assert source.batches == [[1, 2, 'missing'], [3]]
+
+    def test_coroutine_batch_fn(self):
+        source = BatchSource()
+
+        async def batch_fn(keys):
+            rows = source(keys)
+            return [rows[key] for key in keys]
+
+        async def main():
+            loader = AsyncBatchLoader(batch_fn, max_batch_size=2)
+            return await loader.load_many([1, 2, 3])
+
+        assert asyncio.run(main()) == [{'id': 1}, {'id': 2}, {'id': 3}]
+        assert source.batches == [[1, 2], [3]]
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from lesoon_client import BaseClient
+from lesoon_client.core.loader import BatchLoader
+from lesoon_client.core.process import ProcessLocal
+from lesoon_client.core.transport import SessionTransport
+from lesoon_client.core.transport import Urllib3Transport
+
+
+def run_in_child(func) -> dict:
+    """ 在fork的子进程中执行func,返回其json结果."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = json.dumps(func())
+        except BaseException as e:
+            result = json.dumps({'error': repr(e)})
+        os.write(write_fd, result.encode())
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        output = f.read()
+    os.waitpid(pid, 0)
+    return json.loads(output)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='需支持fork')
+class TestAfterFork:
+
+    def test_process_local(self):
+        local = ProcessLocal(os.getpid)
+        assert local.get() == os.getpid()
+        child = run_in_child(lambda: {'pid': os.getpid(), 'value': local.get()})
+        assert child['value'] == child['pid'] != os.getpid()
+
+    def test_client_shared_state(self):
+        parent_session = BaseClient.http
+        BaseClient.executor.submit(lambda: None).result(timeout=5)
+
+        def child():
+            # 父进程的线程池工作线程在子进程中不存在,未重建时会一直阻塞
+            value = BaseClient.executor.submit(lambda: 1).result(timeout=5)
+            session = BaseClient.http
+            return {
+                'value': value,
+                'same_session': session is parent_session,
+                'transport_session': BaseClient().transport.session is session,
+            }
+
+        assert run_in_child(child) == {
+            'value': 1,
+            'same_session': True,
+            'transport_session': True,
+        }
+
+    def test_session_config(self, monkeypatch):
+        monkeypatch.setitem(BaseClient.http.headers, 'X-App', 'lesoon')
+        pools = BaseClient.http.get_adapter('http://').poolmanager.pools
+        BaseClient.http.get_adapter('http://').poolmanager.connection_from_url(
+            'http://localhost:1')
+        assert len(pools) == 1
+
+        def child():
+            # 子进程沿用父进程已配置的会话,仅清空继承的连接池
+            return {
+                'http':
+                    BaseClient.http.headers.get('X-App'),
+                'transport':
+                    BaseClient().transport.session.headers.get('X-App'),
+                'pools':
+                    len(pools),
+            }
+
+        assert run_in_child(child) == {
+            'http': 'lesoon',
+            'transport': 'lesoon',
+            'pools': 0
+        }
+
+    def test_transport_pools(self):
+        session_transport = SessionTransport()
+        urllib3_transport = Urllib3Transport()
+        parent_session = session_transport.session
+        parent_pool = urllib3_transport.pool
+        parent_session.get_adapter('http://').poolmanager.connection_from_url(
+            'http://localhost:1')
+
+        def child():
+            session = session_transport.session
+            return {
+                'same_session':
+                    session is parent_session,
+                'session_pools':
+                    len(session.get_adapter('http://').poolmanager.pools),
+                'new_pool':
+                    urllib3_transport.pool is not parent_pool,
+            }
+
+        assert run_in_child(child) == {
+            'same_session': True,
+            'session_pools': 0,
+            'new_pool': True
+        }
+
+    def test_batch_loader(self):
+        loader = BatchLoader(lambda keys: keys, wait=10)
+        loader.load(1)
+
+        def child():
+            future = loader.load(2)
+            loader.dispatch()
+            return {'value': future.result(timeout=5)}
+
+        assert run_in_child(child) == {'value': 2}
+        loader.dispatch()
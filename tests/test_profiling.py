@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from lesoon_client import BaseClient
+from lesoon_client.core.exceptions import ClientException
+from lesoon_client.core.profiling import CallProfiler
+from lesoon_client.core.transport import BaseTransport
+from lesoon_client.core.transport import WSGITransport
+
+
+class EchoTransport(BaseTransport):
+    """ 不经过网络,直接返回空结果的响应."""
+
+    def request(self, method, url, **kwargs):
+        prepared = self.prepare(method, url, **kwargs)
+        return self.build_response(prepared, 200, 'OK',
+                                   {'Content-Type': 'application/json'}, b'{}')
+
+
+class SimpleClient(BaseClient):
+    BASE_URL = 'http://testserver'
+    URL_PREFIX = '/simple'
+
+
+class TestCallProfiler:
+
+    @pytest.fixture
+    def transport(self, app, api):
+        return WSGITransport(app)
+
+    def test_slow_call_stages(self, transport):
+        profiler = CallProfiler(threshold=0)
+        client = SimpleClient(transport=transport, profiler=profiler)
+        client.POST('/', json={'a': 1})
+
+        calls = profiler.get_slow_calls()
+        assert len(calls) == 1
+        call = calls[0]
+        assert call['method'] == 'POST'
+        assert call['url'] == 'http://testserver/simple/'
+        assert list(call['stagesMs']) == [
+            'pre_request', 'network', 'decode', 'handle_result'
+        ]
+        assert call['elapsedMs'] >= sum(call['stagesMs'].values())
+        assert call['requestSize'] == len(b'{"a": 1}')
+        assert call['responseSize'] > 0
+        assert call['error'] is None
+
+    def test_stream_body(self):
+        profiler = CallProfiler(threshold=0)
+        client = SimpleClient(transport=EchoTransport(), profiler=profiler)
+        client.POST('/', data=io.BytesIO(b'abc'))
+        client.POST('/', data=iter([b'a', b'bc']))
+
+        calls = profiler.get_slow_calls()
+        assert [call['requestSize'] for call in calls] == [3, None]
+
+    def test_threshold(self, transport):
+        profiler = CallProfiler(threshold=60)
+        client = SimpleClient(transport=transport, profiler=profiler)
+        client.GET('/')
+        assert profiler.get_slow_calls() == []
+
+    def test_error(self, transport):
+        profiler = CallProfiler(threshold=0)
+        client = SimpleClient(transport=transport, profiler=profiler)
+        with pytest.raises(ClientException):
+            client.GET('/httpException')
+        assert profiler.get_slow_calls()[0]['error']
+
+    def test_ring_buffer(self, transport):
+        profiler = CallProfiler(threshold=0, maxlen=2)
+        client = SimpleClient(transport=transport, profiler=profiler)
+        for _ in range(3):
+            client.GET('/')
+        assert len(profiler.get_slow_calls()) == 2
+
+    def test_debug_endpoint(self, app, transport):
+        profiler = CallProfiler(threshold=0)
+        profiler.init_app(app)
+        SimpleClient(transport=transport, profiler=profiler).GET('/')
+        resp = app.test_client().get('/debug/client/slowCalls')
+        assert len(resp.get_json()['slowCalls']) == 1
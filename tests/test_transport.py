@@ -0,0 +1,250 @@
+import io
+
+import pytest
+import requests
+import urllib3
+
+from lesoon_client import BaseClient
+from lesoon_client.core.exceptions import ClientException
+from lesoon_client.core.transport import BaseTransport
+from lesoon_client.core.transport import get_transport
+from lesoon_client.core.transport import HttpxTransport
+from lesoon_client.core.transport import LeanTransport
+from lesoon_client.core.transport import RecordReplayTransport
+from lesoon_client.core.transport import Urllib3Transport
+from lesoon_client.core.transport import WSGITransport
+
+
+class SimpleClient(BaseClient):
+    BASE_URL = 'http://testserver'
+    URL_PREFIX = '/simple'
+
+
+class TestWSGITransport:
+    client = None
+
+    @classmethod
+    @pytest.fixture(autouse=True)
+    def setup_class(cls, app, api):
+        cls.client = SimpleClient(transport=WSGITransport(app))
+
+    def test_get(self):
+        params = {'text': 'client-get'}
+        resp = self.client.GET('/', params=params)
+        assert resp['method'] == 'GET'
+        assert resp['params'] == params
+
+    def test_post(self):
+        data = {'a': 1}
+        resp = self.client.POST('/', json=data)
+        assert resp['method'] == 'POST'
+        assert resp['data'] == data
+
+    def test_http_exception(self):
+        with pytest.raises(ClientException):
+            self.client.GET('/httpException')
+
+
+def redirect_app(environ, start_response):
+    path = environ['PATH_INFO']
+    if path == '/target':
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [environ['REQUEST_METHOD'].encode()]
+    location = '/target' if path == '/redirect' else path
+    start_response('302 Found', [('Location', location)])
+    return [b'']
+
+
+class TestWSGIRedirect:
+
+    def test_follow(self):
+        res = WSGITransport(redirect_app).request(
+            'POST', 'http://testserver/redirect', data=b'body')
+        assert res.status_code == 200
+        assert res.text == 'GET'
+        assert [r.status_code for r in res.history] == [302]
+
+    def test_disallow(self):
+        res = WSGITransport(redirect_app).request(
+            'GET', 'http://testserver/redirect', allow_redirects=False)
+        assert res.status_code == 302
+        assert res.headers['Location'] == '/target'
+
+    def test_too_many_redirects(self):
+        with pytest.raises(requests.TooManyRedirects):
+            WSGITransport(redirect_app).request('GET', 'http://testserver/loop')
+
+
+class TestRecordReplayTransport:
+
+    def test_record_replay(self, app, api, tmp_path):
+        params = {'text': 'client-record'}
+        recorder = RecordReplayTransport(
+            str(tmp_path), transport=WSGITransport(app), mode='record')
+        recorded = SimpleClient(transport=recorder).GET('/', params=params)
+
+        player = RecordReplayTransport(str(tmp_path), mode='replay')
+        replayed = SimpleClient(transport=player).GET('/', params=params)
+        assert replayed == recorded
+
+    def test_replay_missing(self, tmp_path):
+        player = RecordReplayTransport(str(tmp_path), mode='replay')
+        with pytest.raises(requests.ConnectionError):
+            SimpleClient(transport=player).GET('/', params={'text': 'none'})
+
+    def test_invalid_mode(self, app, tmp_path):
+        with pytest.raises(ValueError):
+            RecordReplayTransport(
+                str(tmp_path), transport=WSGITransport(app), mode='bogus')
+
+    def test_missing_transport(self, tmp_path):
+        with pytest.raises(ValueError):
+            RecordReplayTransport(str(tmp_path), mode='record')
+
+
+class TestLeanTransport:
+
+    @pytest.fixture(params=['urllib3', 'httpx'])
+    def client(self, request, server):
+        if request.param == 'httpx':
+            pytest.importorskip('httpx')
+            transport = HttpxTransport()
+        else:
+            transport = Urllib3Transport()
+        return SimpleClient(base_url=server, transport=transport)
+
+    def test_get(self, client):
+        params = {'text': 'client-get'}
+        resp = client.GET('/', params=params)
+        assert resp['method'] == 'GET'
+        assert resp['params'] == params
+
+    def test_post(self, client):
+        data = {'a': 1}
+        resp = client.POST('/', json=data)
+        assert resp['method'] == 'POST'
+        assert resp['data'] == data
+        assert resp['headers']['content-type'] == 'application/json'
+
+    def test_http_exception(self, client):
+        with pytest.raises(ClientException) as e:
+            client.GET('/httpException')
+        assert e.value.response.status_code == 404
+
+    def test_connection_error(self):
+        client = SimpleClient(
+            base_url='http://localhost:1', transport=Urllib3Transport())
+        with pytest.raises(requests.ConnectionError) as e:
+            client.GET('/')
+        assert not isinstance(e.value, requests.ConnectTimeout)
+
+    def test_get_transport(self):
+        assert get_transport('urllib3') is get_transport('urllib3')
+        assert isinstance(
+            SimpleClient(transport='urllib3').transport, Urllib3Transport)
+        with pytest.raises(ValueError):
+            get_transport('unknown')
+
+    def test_convert_error(self):
+        error = urllib3.exceptions.ResponseError('too many redirects')
+        assert isinstance(
+            Urllib3Transport._convert_error(error), requests.TooManyRedirects)
+
+    @pytest.mark.parametrize('url,kwargs', [
+        ('http://testserver/a', {
+            'params': {
+                'x': None,
+                'y': [1, 2]
+            }
+        }),
+        ('http://testserver/a?b=1', {
+            'params': {
+                'y': 2
+            }
+        }),
+        ('http://testserver/a#frag', {
+            'params': {
+                'y': 2
+            }
+        }),
+        ('http://testserver/a', {
+            'data': {
+                'x': None,
+                'y': [1, None]
+            }
+        }),
+        ('http://testserver/a', {
+            'data': [('x', 1), ('y', None)]
+        }),
+        ('http://testserver/a', {
+            'data': '中文'
+        }),
+        ('http://testserver/a', {
+            'data': io.BytesIO(b'abc')
+        }),
+        ('http://testserver/a', {
+            'json': {
+                'x': None
+            }
+        }),
+    ])
+    def test_encode_parity(self, url, kwargs):
+        encoded_url, headers, body = LeanTransport().encode(
+            'POST', url, **kwargs)
+        prepared = BaseTransport.prepare('POST', url, **kwargs)
+        assert encoded_url == prepared.url
+        assert headers.get('Content-Type') == prepared.headers.get(
+            'Content-Type')
+        if isinstance(prepared.body, str):
+            assert body == prepared.body.encode('utf-8')
+        else:
+            assert body == prepared.body
+
+    def test_connection_kwargs(self):
+        transport = LeanTransport()
+        transport.encode(
+            'GET', 'http://testserver/', verify=True, stream=False, proxies={})
+        for kwargs in ({
+                'verify': False
+        }, {
+                'cert': 'client.pem'
+        }, {
+                'proxies': {
+                    'http': 'http://proxy'
+                }
+        }, {
+                'stream': True
+        }):
+            with pytest.raises(ValueError):
+                transport.encode('GET', 'http://testserver/', **kwargs)
+
+
+class TestHttpxTransport:
+
+    @pytest.fixture
+    def transport(self):
+        httpx = pytest.importorskip('httpx')
+
+        def handler(request):
+            if request.url.path == '/gzip':
+                return httpx.Response(
+                    200,
+                    headers={'Content-Encoding': 'gzip'},
+                    content=b'not gzip')
+            return httpx.Response(302, headers={'Location': str(request.url)})
+
+        return HttpxTransport(
+            httpx.Client(transport=httpx.MockTransport(handler)))
+
+    def test_allow_redirects(self, transport):
+        res = transport.request(
+            'GET', 'http://testserver/loop', allow_redirects=False)
+        assert res.status_code == 302
+
+    def test_too_many_redirects(self, transport):
+        with pytest.raises(requests.TooManyRedirects):
+            transport.request('GET', 'http://testserver/loop')
+
+    def test_decoding_error(self, transport):
+        with pytest.raises(requests.exceptions.ContentDecodingError):
+            transport.request('GET', 'http://testserver/gzip')
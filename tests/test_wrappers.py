@@ -5,6 +5,7 @@ from lesoon_common.response import Response
 
 from lesoon_client import LesoonClient
 from lesoon_client.core.exceptions import ClientException
+from lesoon_client.wrappers.client import PROPAGATED_HEADERS_KEY
 
 
 class SimpleClient(LesoonClient):
@@ -58,6 +59,45 @@ class TestLesoonClient:
             for trace_key in trace_headers.keys()
         ])
 
+    def test_inherit_headers(self, app):
+        app.config['CLIENT'] = {'PROPAGATE_HEADERS': ['x-tenant-id']}
+        incoming_headers = {'user-speciality': 'userId=111', 'x-tenant-id': '1'}
+        with app.test_request_context(headers=incoming_headers) as ctx:
+            resp = self.client.GET('/', load_response=False)
+            assert ctx.request.environ[PROPAGATED_HEADERS_KEY] == {
+                'custom': incoming_headers,
+                'trace': {}
+            }
+            assert all([
+                resp['headers'].get(key) == value
+                for key, value in incoming_headers.items()
+            ])
+
+    def test_propagated_headers_cache(self, app):
+        with app.test_request_context(headers={'user-speciality': 'userId=1'}):
+            custom, trace = self.client.propagated_headers()
+            second = SimpleClient().propagated_headers()
+            assert second[0] is custom and second[1] is trace
+            kwargs: dict = {'headers': {}}
+            LesoonClient.inherit_custom_headers(kwargs)
+            assert kwargs['headers'] == {'user-speciality': 'userId=1'}
+
+    def test_loader(self):
+        loader = self.client.loader('/batchGet')
+        futures = loader.load_many([1, 2, -1])
+        assert [f.result(timeout=5) for f in futures] == [{
+            'id': 1
+        }, {
+            'id': 2
+        }, None]
+
+    def test_loader_service_unavailable(self):
+        loader = self.client.loader('/serviceUnavailable', method='GET')
+        future = loader.load(1)
+        with pytest.raises(ServiceError):
+            future.result(timeout=5)
+        assert loader.load(1) is not future
+
     def test_http_exception(self):
         with pytest.raises(ServiceError):
             self.client.GET('/httpException')
@@ -86,3 +126,20 @@ class TestLesoonClient:
         self.client.init_app(app)
         resp = self.client.GET('/standard')
         assert resp.code == ResponseCode.Success.code
+
+    def test_adaptive_limit_config(self, app, server):
+        app.config['CLIENT'] = {
+            'BASE_URL': server,
+            'ADAPTIVE_LIMIT': {
+                'initial_limit': 5
+            }
+        }
+        client, other = SimpleClient(), SimpleClient()
+        client.init_app(app)
+        other.init_app(app)
+        assert client.limiter is other.limiter
+        resp = client.GET('/standard')
+        assert resp.code == ResponseCode.Success.code
+        stats = SimpleClient.limiter_stats()['simple']
+        assert stats['inFlight'] == 0
+        assert stats['rejected'] == 0